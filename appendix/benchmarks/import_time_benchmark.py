@@ -0,0 +1,107 @@
+"""Measure cold-start import time of the service entry modules.
+
+Each module in IMPORT_TIME_BUDGET_MS is imported in a fresh interpreter with
+`python -X importtime`. The script reports the cumulative import time, the
+total process startup time and any heavy dependency that got loaded eagerly,
+appends the measurements to a JSONL history file so startup time can be
+tracked over commits, and exits non-zero when a budget is exceeded.
+"""
+
+import sys
+sys.path.append("/home/kosala/git-repos/contract_inspect/")
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from src.core.config import IMPORT_TIME_BUDGET_MS
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+# Dependencies that must only be loaded on first use.
+HEAVY_MODULES = ("weaviate", "ollama", "unstructured", "torch", "transformers", "onnxruntime", "grpc")
+
+
+def measure(module: str) -> dict:
+    """Import `module` in a fresh interpreter and parse the importtime report."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [str(REPO_ROOT), str(REPO_ROOT / "src"), env.get("PYTHONPATH", "")]
+    )
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    startup_ms = (time.perf_counter() - start) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{proc.stderr[-2000:]}")
+
+    cumulative_us = None
+    loaded = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line.split(":", 1)[1].split("|"))
+        if not cumulative.isdigit():
+            continue  # header line
+        if name == module:
+            cumulative_us = int(cumulative)
+        top_level = name.split(".")[0]
+        if top_level in HEAVY_MODULES:
+            loaded.add(top_level)
+    return {
+        "import_ms": (cumulative_us or 0) / 1000,
+        "startup_ms": startup_ms,
+        "heavy_modules_loaded": sorted(loaded),
+    }
+
+
+def git_revision() -> str | None:
+    proc = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    return proc.stdout.strip() or None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per module (median is reported)")
+    parser.add_argument("--history", type=Path, default=Path("import_time_history.jsonl"),
+                        help="JSONL file the measurements are appended to")
+    args = parser.parse_args()
+
+    measure(next(iter(IMPORT_TIME_BUDGET_MS)))  # populate __pycache__ so runs measure warm bytecode
+    record = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "modules": {},
+    }
+    over_budget = []
+    print(f"{'module':<40} {'import ms':>10} {'startup ms':>11} {'budget ms':>10}  eager heavy deps")
+    for module, budget in IMPORT_TIME_BUDGET_MS.items():
+        runs = [measure(module) for _ in range(args.runs)]
+        result = {
+            "import_ms": statistics.median(r["import_ms"] for r in runs),
+            "startup_ms": statistics.median(r["startup_ms"] for r in runs),
+            "budget_ms": budget,
+            "heavy_modules_loaded": runs[-1]["heavy_modules_loaded"],
+        }
+        record["modules"][module] = result
+        if result["import_ms"] > budget or result["heavy_modules_loaded"]:
+            over_budget.append(module)
+        print(
+            f"{module:<40} {result['import_ms']:>10.1f} {result['startup_ms']:>11.1f} {budget:>10}  "
+            f"{', '.join(result['heavy_modules_loaded']) or '-'}"
+        )
+
+    with open(args.history, "a") as f:
+        f.write(json.dumps(record) + "\n")
+    if over_budget:
+        print(f"Over budget: {', '.join(over_budget)}")
+        sys.exit(1)
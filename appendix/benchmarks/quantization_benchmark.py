@@ -0,0 +1,267 @@
+"""Compare vector index settings for the Page collection.
+
+For every combination of quantization and HNSW parameters a scratch copy of
+the source collection is created with the stored vectors (no re-embedding),
+and the script reports an estimated vector memory footprint, the measured
+heap growth of the Weaviate node (when Prometheus metrics are enabled),
+query latency and recall@k against an exact brute-force search.
+
+PQ and SQ train on the whole corpus (`trainingLimit` = corpus size, which
+needs ASYNC_INDEXING on the Weaviate node, see compose-weaviate.yml); PQ is
+skipped for corpora with fewer objects than centroids. Settings whose index
+still did not end up compressed are flagged, and their memory estimate is the
+uncompressed one.
+"""
+
+import sys
+sys.path.append("/home/kosala/git-repos/contract_inspect/")
+import argparse
+import copy
+import itertools
+import json
+import logging
+import statistics
+import time
+import urllib.request
+
+import numpy as np
+import ollama
+
+from src.core.config import WEAVIATE_QUANTIZATION_OPTIONS, WEAVIATE_SCHEMA, WEAVIATE_VECTOR_INDEX_CONFIG
+from src.sp_adapters.weaviate_adapter import WeaviateVectorDBAdapter
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+DEFAULT_QUERIES = [
+    "termination notice period",
+    "governing law and jurisdiction",
+    "payment terms and invoicing",
+    "limitation of liability",
+    "renewal of the agreement",
+    "confidentiality obligations",
+    "service level agreement and support",
+    "data protection and privacy",
+]
+# HNSW layer 0 keeps up to 2 * maxConnections neighbour ids of 8 bytes each.
+_LINK_BYTES = 8
+_PQ_CENTROIDS = WEAVIATE_QUANTIZATION_OPTIONS["pq"]["centroids"]
+
+
+def load_corpus(adapter: WeaviateVectorDBAdapter, collection: str) -> tuple[list[dict], np.ndarray]:
+    """Read every object of the source collection together with its vector."""
+    objects, vectors = [], []
+    for result in adapter.iterate_objects(collection, include_vector=True):
+        if result.vector is None:
+            continue
+        objects.append(result.properties)
+        vectors.append(result.vector)
+    return objects, np.asarray(vectors, dtype=np.float32)
+
+
+def embed_queries(queries: list[str]) -> np.ndarray:
+    """Embed the benchmark queries with the same model used by the collection."""
+    model = WEAVIATE_SCHEMA["moduleConfig"]["text2vec-ollama"]["model"]
+    response = ollama.embed(model=model, input=queries)
+    return np.asarray(response["embeddings"], dtype=np.float32)
+
+
+def object_key(props: dict) -> tuple:
+    return props.get("document"), props.get("page_number")
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Brute-force cosine top-k, the ground truth used for recall."""
+    corpus_n = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+    queries_n = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    scores = queries_n @ corpus_n.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def estimate_index_bytes(n: int, dims: int, index_config: dict) -> int:
+    """Rough in-memory size of the vector cache plus the HNSW layer-0 graph."""
+    quantization = index_config.get("quantization", "none")
+    if quantization == "pq":
+        segments = index_config.get("quantizerOptions", {}).get("segments") or dims // 4
+        per_vector = segments
+    elif quantization == "bq":
+        per_vector = dims // 8
+    elif quantization == "sq":
+        per_vector = dims
+    else:
+        per_vector = dims * 4
+    graph = 2 * index_config["maxConnections"] * _LINK_BYTES
+    return n * (per_vector + graph)
+
+
+def wait_for_index(
+    adapter: WeaviateVectorDBAdapter,
+    name: str,
+    expect_compressed: bool,
+    timeout: float,
+    interval: float = 0.5,
+) -> bool:
+    """Poll the shards of `name` until indexing (and compression) settled.
+
+    Returns whether every shard holds compressed vectors. Without
+    compression expected, only the vector queue has to drain.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        shards = adapter.shard_status(name)
+        indexed = bool(shards) and all(
+            s["vector_queue_length"] == 0 and s["vector_indexing_status"] == "READY" for s in shards
+        )
+        compressed = bool(shards) and all(s["compressed"] for s in shards)
+        if indexed and (compressed or not expect_compressed):
+            return compressed
+        if time.monotonic() >= deadline:
+            logger.warning("%s: index not settled after %.0fs (indexed=%s, compressed=%s)",
+                           name, timeout, indexed, compressed)
+            return compressed
+        time.sleep(interval)
+
+
+def scrape_heap_bytes(metrics_url: str | None) -> int | None:
+    """Return `go_memstats_heap_inuse_bytes` from Weaviate's Prometheus endpoint."""
+    if not metrics_url:
+        return None
+    try:
+        with urllib.request.urlopen(metrics_url, timeout=5) as resp:
+            for line in resp.read().decode().splitlines():
+                if line.startswith("go_memstats_heap_inuse_bytes "):
+                    return int(float(line.split()[1]))
+    except OSError as e:
+        logger.warning("Could not scrape %s: %s", metrics_url, e)
+    return None
+
+
+def benchmark_setting(
+    adapter: WeaviateVectorDBAdapter,
+    name: str,
+    index_config: dict,
+    objects: list[dict],
+    vectors: np.ndarray,
+    query_vectors: np.ndarray,
+    truth: np.ndarray,
+    k: int,
+    rounds: int,
+    metrics_url: str | None,
+    settle_timeout: float,
+) -> dict:
+    schema = copy.deepcopy(WEAVIATE_SCHEMA)
+    schema["class"] = name
+    adapter.drop_collection(name)
+    heap_before = scrape_heap_bytes(metrics_url)
+    adapter.create_schema(schema, vector_index_config=index_config)
+    adapter.insert_objects(name, objects, vectors=vectors.tolist())
+    # Compression is trained asynchronously once trainingLimit objects exist.
+    quantization = index_config.get("quantization", "none")
+    compressed = wait_for_index(adapter, name, quantization != "none", settle_timeout)
+    if quantization != "none" and not compressed:
+        logger.warning("%s: %s compression did not activate, measuring the uncompressed index", name, quantization)
+    heap_after = scrape_heap_bytes(metrics_url)
+
+    truth_keys = [{object_key(objects[i]) for i in row} for row in truth]
+    latencies, recalls = [], []
+    for round_no in range(rounds + 1):
+        for qv, expected in zip(query_vectors, truth_keys):
+            start = time.perf_counter()
+            hits = adapter.search_near_vector(name, qv.tolist(), limit=k, return_distance=False)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if round_no == 0:
+                continue  # warm-up round
+            latencies.append(elapsed_ms)
+            recalls.append(len({object_key(h.properties) for h in hits} & expected) / k)
+
+    adapter.drop_collection(name)
+    # what the index actually holds, not what was requested
+    effective_config = index_config if compressed else {**index_config, "quantization": "none"}
+    return {
+        "setting": name,
+        "index_config": index_config,
+        "compressed": compressed,
+        "estimated_index_mb": estimate_index_bytes(len(objects), vectors.shape[1], effective_config) / 2**20,
+        "heap_delta_mb": None if heap_before is None or heap_after is None else (heap_after - heap_before) / 2**20,
+        "latency_p50_ms": statistics.median(latencies),
+        "latency_p95_ms": float(np.percentile(latencies, 95)),
+        f"recall@{k}": statistics.mean(recalls),
+    }
+
+
+def build_settings(args: argparse.Namespace, corpus_size: int) -> list[tuple[str, dict]]:
+    settings = []
+    grid = itertools.product(args.quantization, args.ef, args.ef_construction, args.max_connections)
+    for quantization, ef, ef_construction, max_connections in grid:
+        index_config = {
+            **WEAVIATE_VECTOR_INDEX_CONFIG,
+            "quantization": quantization,
+            "ef": ef,
+            "efConstruction": ef_construction,
+            "maxConnections": max_connections,
+        }
+        if quantization == "pq" and corpus_size < _PQ_CENTROIDS:
+            # k-means needs at least one vector per centroid
+            logger.warning("Skipping %s: PQ needs at least %d objects, the corpus has %d",
+                           quantization, _PQ_CENTROIDS, corpus_size)
+            continue
+        if quantization in ("pq", "sq"):
+            # train on the whole benchmark corpus so compression kicks in once it is inserted
+            index_config["quantizerOptions"] = {"trainingLimit": corpus_size}
+        name = f"Bench_{quantization}_ef{ef}_efc{ef_construction}_m{max_connections}".replace("-", "m")
+        settings.append((name, index_config))
+    return settings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--source", default=WEAVIATE_SCHEMA["class"], help="collection holding the indexed corpus")
+    parser.add_argument("--queries", help="file with one query per line")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--quantization", nargs="+", default=["none", "pq", "bq", "sq"])
+    parser.add_argument("--ef", nargs="+", type=int, default=[WEAVIATE_VECTOR_INDEX_CONFIG["ef"]])
+    parser.add_argument("--ef-construction", nargs="+", type=int, default=[WEAVIATE_VECTOR_INDEX_CONFIG["efConstruction"]])
+    parser.add_argument("--max-connections", nargs="+", type=int, default=[WEAVIATE_VECTOR_INDEX_CONFIG["maxConnections"]])
+    parser.add_argument("--settle-timeout", type=float, default=60.0,
+                        help="seconds to wait for indexing and compression after the insert")
+    parser.add_argument("--metrics-url", default="http://localhost:2112/metrics", help="Weaviate Prometheus endpoint ('' to disable)")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries) as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    adapter = WeaviateVectorDBAdapter()
+    adapter.connect()
+    try:
+        objects, vectors = load_corpus(adapter, args.source)
+        if not objects:
+            raise SystemExit(f"collection {args.source} is empty, run index_invoker.py first")
+        logger.info("Loaded %d objects (%d dims) from %s", len(objects), vectors.shape[1], args.source)
+        query_vectors = embed_queries(queries)
+        truth = exact_top_k(vectors, query_vectors, args.k)
+
+        results = []
+        for name, index_config in build_settings(args, len(objects)):
+            logger.info("Benchmarking %s", name)
+            results.append(benchmark_setting(
+                adapter, name, index_config, objects, vectors, query_vectors,
+                truth, args.k, args.rounds, args.metrics_url or None, args.settle_timeout,
+            ))
+    finally:
+        adapter.close()
+
+    print(f"{'setting':<40} {'est. MB':>8} {'heap MB':>8} {'p50 ms':>8} {'p95 ms':>8} {'recall@' + str(args.k):>9}")
+    for r in results:
+        heap = "-" if r["heap_delta_mb"] is None else f"{r['heap_delta_mb']:.1f}"
+        flag = "" if r["compressed"] or r["index_config"]["quantization"] == "none" else "  (not compressed)"
+        print(
+            f"{r['setting']:<40} {r['estimated_index_mb']:>8.2f} {heap:>8} "
+            f"{r['latency_p50_ms']:>8.2f} {r['latency_p95_ms']:>8.2f} {r[f'recall@{args.k}']:>9.3f}{flag}"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
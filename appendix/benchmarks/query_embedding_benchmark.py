@@ -0,0 +1,137 @@
+"""Compare query embedding in-process (ONNX) with the Ollama path.
+
+Reports, for the same queries:
+- parity: cosine similarity between the local and the Ollama vectors,
+- embedding latency: one query per Ollama `embed` call (what Weaviate's
+  text2vec-ollama does per search) vs. one query per local call, and a whole
+  batch in one call for both,
+- search latency (with --search): `search_vector`/`search_hybrid` letting
+  Weaviate embed the query vs. passing the locally embedded `query_vector`.
+
+The local embedder's LRU cache is disabled so repeated rounds measure the model.
+"""
+
+import sys
+sys.path.append("/home/kosala/git-repos/contract_inspect/")
+import argparse
+import json
+import logging
+import statistics
+import time
+from typing import Callable
+
+from src.core.config import QUERY_EMBEDDING_CONFIG, WEAVIATE_SCHEMA
+from src.sp_adapters.onnx_embedding_adapter import OnnxEmbeddingAdapter, check_parity, ollama_embedder
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+DEFAULT_QUERIES = [
+    "termination notice period",
+    "governing law and jurisdiction",
+    "payment terms and invoicing",
+    "limitation of liability",
+    "renewal of the agreement",
+    "confidentiality obligations",
+    "service level agreement and support",
+    "data protection and privacy",
+]
+
+
+def timed(fn: Callable[[], object], rounds: int) -> list[float]:
+    """Wall-clock milliseconds of `rounds` calls of `fn` (after one warm-up call)."""
+    fn()
+    out = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - start) * 1000)
+    return out
+
+
+def summarize(samples: list[float]) -> dict:
+    samples = sorted(samples)
+    return {
+        "p50_ms": statistics.median(samples),
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "mean_ms": statistics.fmean(samples),
+    }
+
+
+def benchmark_embedding(local: OnnxEmbeddingAdapter, remote: Callable, queries: list[str], rounds: int) -> dict:
+    results = {}
+    for name, embed in (("ollama", remote), ("onnx", local.embed)):
+        single = [ms for q in queries for ms in timed(lambda q=q: embed([q]), rounds)]
+        batch = timed(lambda: embed(queries), rounds)
+        results[name] = {
+            "single": summarize(single),
+            # per query when all queries are embedded in one call
+            "batch_per_query": summarize([ms / len(queries) for ms in batch]),
+        }
+    return results
+
+
+def benchmark_search(local: OnnxEmbeddingAdapter, queries: list[str], rounds: int, collection: str, limit: int) -> dict:
+    from src.sp_adapters.weaviate_adapter import WeaviateVectorDBAdapter
+
+    adapter = WeaviateVectorDBAdapter()
+    adapter.connect()
+    results = {}
+    try:
+        for search in ("search_vector", "search_hybrid"):
+            fn = getattr(adapter, search)
+            server = [ms for q in queries for ms in timed(lambda q=q: fn(collection, q, limit=limit), rounds)]
+            # embedding is part of the measured time on the local path
+            in_process = [
+                ms
+                for q in queries
+                for ms in timed(lambda q=q: fn(collection, q, limit=limit, query_vector=local.embed_query(q)), rounds)
+            ]
+            results[search] = {"weaviate_embeds": summarize(server), "local_query_vector": summarize(in_process)}
+    finally:
+        adapter.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", help="file with one query per line")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--onnx-file", default=QUERY_EMBEDDING_CONFIG["onnx_file"],
+                        help="model file in the Hub repo, e.g. onnx/model_quantized.onnx")
+    parser.add_argument("--threads", type=int, default=QUERY_EMBEDDING_CONFIG["intra_op_threads"])
+    parser.add_argument("--search", action="store_true", help="also time searches against a running Weaviate")
+    parser.add_argument("--collection", default=WEAVIATE_SCHEMA["class"])
+    parser.add_argument("--limit", type=int, default=3)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries) as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    local = OnnxEmbeddingAdapter(onnx_file=args.onnx_file, intra_op_threads=args.threads, cache_size=0).load()
+    remote = ollama_embedder()
+
+    cosines = check_parity(local, queries, remote)
+    report = {
+        "model": f"{local.repo_id}/{local.onnx_file}",
+        "queries": len(queries),
+        "parity": {"min_cosine": min(cosines), "mean_cosine": statistics.fmean(cosines)},
+        "embedding": benchmark_embedding(local, remote, queries, args.rounds),
+    }
+    if args.search:
+        report["search"] = benchmark_search(local, queries, args.rounds, args.collection, args.limit)
+
+    print(f"parity: min cosine {report['parity']['min_cosine']:.5f}, mean {report['parity']['mean_cosine']:.5f} "
+          f"(required {QUERY_EMBEDDING_CONFIG['parity_min_cosine']})")
+    print(f"{'path':<40} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}")
+    rows = [(f"embed/{name}/{mode}", stats) for name, modes in report["embedding"].items() for mode, stats in modes.items()]
+    rows += [(f"{search}/{path}", stats) for search, paths in report.get("search", {}).items() for path, stats in paths.items()]
+    for name, stats in rows:
+        print(f"{name:<40} {stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['mean_ms']:>8.2f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
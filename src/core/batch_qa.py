@@ -0,0 +1,407 @@
+"""Offline batch question answering over every contract in metadata.yml.
+
+Reads a query file (JSONL or CSV with a `query` column and optional `id` and
+`document` columns) and answers each query against each document (or only
+the given `document`). Entity extraction, retrieval and answer generation
+run as pipelined stages, each with its own worker pool so Ollama and
+Weaviate concurrency can be sized independently. With a local query embedder
+(see rag.init_query_embedding), the entity strings waiting for retrieval are
+embedded in batches before searching. Lookup questions the clause
+index can answer (see clause_lib.py) skip retrieval and generation. Every finished job is
+appended to the output JSONL file, which doubles as the checkpoint: re-running
+the same command skips jobs that already have an answer.
+
+Usage:
+    python src/core/batch_qa.py --queries checklist.jsonl --output answers.jsonl
+"""
+
+import sys
+
+sys.path.append("/home/kosala/git-repos/contract_inspect/")
+sys.path.append("/home/kosala/git-repos/contract_inspect/src")
+import argparse
+import csv
+import json
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+import yaml
+
+from src.core.config import BATCH_QA_CONFIG, METADATA_CONFIG_PATH, WEAVIATE_SCHEMA
+from src.core.prompt_processor import prompt_processor
+from src.core.rag import extract_query_entities, generate_rag_answer, init_query_embedding, warm_up
+from src.core.retriver.util import clause_lib, search_lib
+from src.core.spi.vector_db_spi import SearchResult
+from src.sp_adapters.ollama_llm_sp_adapter import OllamaLLMSPAdapter
+from src.sp_adapters.weaviate_adapter import WeaviateVectorDBAdapter
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+_STOP = object()  # end-of-stream marker passed between stages
+
+
+@dataclass
+class BatchJob:
+    """One query answered against one document."""
+
+    id: str
+    query: str
+    document: str
+    entities: Optional[str] = None
+    hits: list[SearchResult] = field(default_factory=list)
+    answer: Optional[str] = None
+    answered_from: Optional[str] = None
+    error: Optional[str] = None
+    timings: dict[str, float] = field(default_factory=dict)
+
+    def to_record(self) -> dict:
+        return {
+            "id": self.id,
+            "query": self.query,
+            "document": self.document,
+            "answer": self.answer,
+            "answered_from": self.answered_from,
+            "sources": [
+                {
+                    "document": h.properties.get("document"),
+                    "page_number": h.properties.get("page_number"),
+                    # every page sharing the passage text, see dedup_lib.py
+                    "occurrences": h.properties.get("occurrences"),
+                }
+                for h in self.hits
+            ],
+            "error": self.error,
+            "timings": self.timings,
+        }
+
+
+@dataclass
+class StageStats:
+    name: str
+    workers: int
+    processed: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0
+
+    def summary(self, wall_seconds: float) -> dict:
+        return {
+            "workers": self.workers,
+            "processed": self.processed,
+            "failed": self.failed,
+            "mean_seconds": self.busy_seconds / self.processed if self.processed else 0.0,
+            # share of the run the stage's workers spent busy
+            "utilisation": self.busy_seconds / (wall_seconds * self.workers) if wall_seconds else 0.0,
+        }
+
+
+class _Stage:
+    """A pool of worker threads applying `fn` to jobs from `inbox`.
+
+    Jobs that already failed or were answered in an earlier stage are
+    forwarded untouched so they still reach the writer and get recorded.
+    """
+
+    def __init__(self, name: str, fn: Callable[[BatchJob], None], workers: int,
+                 inbox: queue.Queue, outbox: queue.Queue) -> None:
+        self.fn = fn
+        self.inbox = inbox
+        self.outbox = outbox
+        self.stats = StageStats(name, workers)
+        self._lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"{name}-{i}", daemon=True)
+            for i in range(workers)
+        ]
+
+    def start(self) -> None:
+        for t in self._threads:
+            t.start()
+
+    def stop(self) -> None:
+        """Signal end of input and wait for all workers to drain it."""
+        for _ in self._threads:
+            self.inbox.put(_STOP)
+        for t in self._threads:
+            t.join()
+
+    def _work(self) -> None:
+        while True:
+            job = self.inbox.get()
+            if job is _STOP:
+                return
+            if job.error is None and job.answer is None:
+                start = time.perf_counter()
+                try:
+                    self.fn(job)
+                except Exception as e:
+                    job.error = f"{self.stats.name}: {e}"
+                    logger.warning("Job %s failed in %s: %s", job.id, self.stats.name, e)
+                elapsed = time.perf_counter() - start
+                job.timings[self.stats.name] = elapsed
+                with self._lock:
+                    self.stats.processed += 1
+                    self.stats.busy_seconds += elapsed
+                    self.stats.failed += job.error is not None
+            self.outbox.put(job)
+
+
+class _BatchStage(_Stage):
+    """A single worker applying `fn` to all jobs waiting in `inbox`, up to `batch_size`."""
+
+    def __init__(self, name: str, fn: Callable[[list[BatchJob]], None], batch_size: int,
+                 inbox: queue.Queue, outbox: queue.Queue) -> None:
+        super().__init__(name, fn, 1, inbox, outbox)
+        self.batch_size = batch_size
+
+    def _work(self) -> None:
+        stopped = False
+        while not stopped:
+            batch = [self.inbox.get()]
+            # take whatever else is already waiting, without delaying the first job
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.inbox.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in batch:
+                stopped = True
+                batch = [job for job in batch if job is not _STOP]
+            pending = [job for job in batch if job.error is None and job.answer is None]
+            if pending:
+                start = time.perf_counter()
+                try:
+                    self.fn(pending)
+                except Exception as e:
+                    for job in pending:
+                        job.error = f"{self.stats.name}: {e}"
+                    logger.warning("Batch of %d jobs failed in %s: %s", len(pending), self.stats.name, e)
+                elapsed = time.perf_counter() - start
+                for job in pending:
+                    job.timings[self.stats.name] = elapsed / len(pending)
+                with self._lock:
+                    self.stats.processed += len(pending)
+                    self.stats.busy_seconds += elapsed
+                    self.stats.failed += sum(job.error is not None for job in pending)
+            for job in batch:
+                self.outbox.put(job)
+
+
+class _EntityCache:
+    """Extract entities once per distinct query, shared across documents."""
+
+    def __init__(self) -> None:
+        self._futures: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+
+    def get(self, query: str) -> str:
+        with self._lock:
+            future = self._futures.get(query)
+            owner = future is None
+            if owner:
+                future = self._futures[query] = Future()
+            else:
+                self.hits += 1
+        if owner:
+            try:
+                future.set_result(extract_query_entities(query))
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+
+def load_queries(path: Path) -> list[dict]:
+    """Read query rows from a JSONL or CSV file."""
+    with open(path, newline="") as f:
+        if path.suffix.lower() == ".csv":
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+    for i, row in enumerate(rows):
+        if not row.get("query"):
+            raise ValueError(f"{path}: row {i + 1} has no 'query'")
+        row.setdefault("id", str(i + 1))
+    return rows
+
+
+def build_jobs(queries: list[dict], agreements: list[dict]) -> list[BatchJob]:
+    """Expand queries x documents; rows with a `document` only target that file."""
+    documents = [a.get("file_name") for a in agreements]
+    jobs = []
+    for row in queries:
+        targets = [row["document"]] if row.get("document") else documents
+        for document in targets:
+            jobs.append(BatchJob(id=f"{row['id']}::{document}", query=row["query"], document=document))
+    return jobs
+
+
+def load_checkpoint(output: Path) -> set[str]:
+    """Return the ids of jobs already answered in a previous run."""
+    done: set[str] = set()
+    if output.exists():
+        with open(output) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    if record.get("error") is None:
+                        done.add(record["id"])
+    return done
+
+
+def run_batch(
+    jobs: list[BatchJob],
+    output: Path,
+    metadata_filter_config: dict,
+    *,
+    collection: str = WEAVIATE_SCHEMA["class"],
+    query_type: str = BATCH_QA_CONFIG["query_type"],
+    limit: int = BATCH_QA_CONFIG["limit"],
+    extract_workers: int = BATCH_QA_CONFIG["extract_workers"],
+    search_workers: int = BATCH_QA_CONFIG["search_workers"],
+    generate_workers: int = BATCH_QA_CONFIG["generate_workers"],
+    queue_size: int = BATCH_QA_CONFIG["queue_size"],
+    embed_batch_size: int = BATCH_QA_CONFIG["embed_batch_size"],
+    use_clause_index: bool = True,
+) -> dict:
+    """Run the jobs through the pipeline and append results to `output`.
+
+    The prompt processor and search_lib must already be initialized.
+
+    Returns:
+        Throughput statistics for the run.
+    """
+    entity_cache = _EntityCache()
+    metadata_filters = search_lib.add_metadata_filters(metadata_filter_config)
+
+    def extract(job: BatchJob) -> None:
+        clause_answer = clause_lib.answer_from_clauses(job.query, job.document) if use_clause_index else None
+        if clause_answer is not None:
+            job.answer = clause_answer.answer
+            job.answered_from = "clause_index"
+            job.hits = [
+                SearchResult(properties={"document": job.document, "page_number": clause_answer.clause.get("page_number")})
+            ]
+            return
+        job.entities = entity_cache.get(job.query)
+
+    def embed(jobs: list[BatchJob]) -> None:
+        # one embedder call for the distinct entity strings; the searches then hit its cache
+        entities = list(dict.fromkeys(job.entities for job in jobs))
+        try:
+            search_lib.embed_queries(entities)
+        except Exception as e:
+            # the vector DB can still embed the queries itself
+            logger.warning("Batch query embedding failed, using the vectorizer: %s", e)
+
+    def retrieve(job: BatchJob) -> None:
+        job.hits = search_lib.weaviate_search_results(
+            query=job.entities,
+            type=query_type,
+            collection=collection,
+            limit=limit,
+            filters=metadata_filters & search_lib.document_filter(job.document),
+            # a failed search lands in job.error and is retried on resume
+            raise_errors=True,
+        )
+
+    def generate(job: BatchJob) -> None:
+        job.answer = generate_rag_answer(job.query, job.hits)
+        job.answered_from = "rag"
+
+    batch_embed = query_type != "bm25" and search_lib.query_embedder is not None
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(5 if batch_embed else 4)]
+    stages = [_Stage("extract", extract, extract_workers, queues[0], queues[1])]
+    if batch_embed:
+        stages.append(_BatchStage("embed", embed, embed_batch_size, queues[1], queues[2]))
+    stages += [
+        _Stage("retrieve", retrieve, search_workers, queues[-3], queues[-2]),
+        _Stage("generate", generate, generate_workers, queues[-2], queues[-1]),
+    ]
+    counts = {"completed": 0, "failed": 0, "clause_index_answers": 0}
+
+    def write() -> None:
+        with open(output, "a") as f:
+            while True:
+                job = queues[-1].get()
+                if job is _STOP:
+                    return
+                f.write(json.dumps(job.to_record(), default=str) + "\n")
+                f.flush()  # every written line is a checkpoint
+                counts["failed" if job.error else "completed"] += 1
+                counts["clause_index_answers"] += job.answered_from == "clause_index"
+
+    writer = threading.Thread(target=write, name="writer", daemon=True)
+    start = time.perf_counter()
+    for stage in stages:
+        stage.start()
+    writer.start()
+    for job in jobs:
+        queues[0].put(job)
+    for stage in stages:
+        stage.stop()
+    queues[-1].put(_STOP)
+    writer.join()
+    wall_seconds = time.perf_counter() - start
+
+    return {
+        "jobs": len(jobs),
+        **counts,
+        "wall_seconds": wall_seconds,
+        "jobs_per_second": counts["completed"] / wall_seconds if wall_seconds else 0.0,
+        "entity_cache_hits": entity_cache.hits,
+        "stages": {s.stats.name: s.stats.summary(wall_seconds) for s in stages},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer a query file against every contract.")
+    parser.add_argument("--queries", type=Path, required=True, help="JSONL or CSV file with a 'query' column")
+    parser.add_argument("--output", type=Path, required=True, help="JSONL file for answers (also the checkpoint)")
+    parser.add_argument("--query-type", default=BATCH_QA_CONFIG["query_type"], choices=["bm25", "vector", "hybrid"])
+    parser.add_argument("--limit", type=int, default=BATCH_QA_CONFIG["limit"])
+    parser.add_argument("--extract-workers", type=int, default=BATCH_QA_CONFIG["extract_workers"])
+    parser.add_argument("--search-workers", type=int, default=BATCH_QA_CONFIG["search_workers"])
+    parser.add_argument("--generate-workers", type=int, default=BATCH_QA_CONFIG["generate_workers"])
+    args = parser.parse_args()
+
+    metadata_config = yaml.safe_load(open(METADATA_CONFIG_PATH))
+    jobs = build_jobs(load_queries(args.queries), metadata_config.get("service_agreements"))
+    done = load_checkpoint(args.output)
+    pending = [job for job in jobs if job.id not in done]
+    logger.info("%d jobs, %d already answered, %d to run", len(jobs), len(jobs) - len(pending), len(pending))
+
+    # batch lane: interactive queries on the same Ollama instance go first
+    prompt_processor.init(OllamaLLMSPAdapter(priority="batch"))
+    warm_up()
+    # entity strings are embedded in batches by run_batch and cached for all documents
+    init_query_embedding()
+    weaviate_adapter = WeaviateVectorDBAdapter()
+    weaviate_adapter.connect()
+    search_lib.init(adapter=weaviate_adapter)
+    try:
+        stats = run_batch(
+            pending,
+            args.output,
+            metadata_config["metadata_filter_config"],
+            query_type=args.query_type,
+            limit=args.limit,
+            extract_workers=args.extract_workers,
+            search_workers=args.search_workers,
+            generate_workers=args.generate_workers,
+        )
+    finally:
+        weaviate_adapter.close()
+        search_lib.clear_vector_db_adapter()
+
+    stats["llm_scheduler"] = prompt_processor.get_llm_adapter().metrics()
+    stats_path = args.output.with_suffix(".stats.json")
+    with open(stats_path, "w") as f:
+        json.dump(stats, f, indent=2)
+    print(json.dumps(stats, indent=2))
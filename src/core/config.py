@@ -34,6 +34,28 @@ WEAVIATE_SCHEMA = {
             "name": "effective_date",
             "dataType": ["date"],
             "description": "Date when the document was created"
+        },
+        {
+            "name": "documents",
+            "dataType": ["text[]"],
+            "description": "Every document containing this page's text (see dedup_lib.py)",
+            "moduleConfig": {
+                "text2vec-ollama": {
+                    "skip": True,
+                    "vectorizePropertyName": False
+                }
+            }
+        },
+        {
+            "name": "occurrences",
+            "dataType": ["text[]"],
+            "description": "Every '<document>#<page_number>' containing this page's text",
+            "moduleConfig": {
+                "text2vec-ollama": {
+                    "skip": True,
+                    "vectorizePropertyName": False
+                }
+            }
         }
     ],
     "moduleConfig": {
@@ -47,12 +69,82 @@ WEAVIATE_SCHEMA = {
             "api_endpoint": "http://host.docker.internal:11434",
             "type": "text"
         },  
-    }
+    },
+    "vectorIndexType": "hnsw"
+}
+# HNSW tuning and vector compression for the Page collection. `quantization`
+# selects one of WEAVIATE_QUANTIZATION_OPTIONS ("none" keeps full float32 vectors).
+# ef=-1 lets Weaviate pick ef dynamically from the query limit.
+WEAVIATE_VECTOR_INDEX_CONFIG = {
+    "quantization": os.environ.get("WEAVIATE_QUANTIZATION", "none"),
+    "ef": int(os.environ.get("WEAVIATE_HNSW_EF", -1)),
+    "efConstruction": int(os.environ.get("WEAVIATE_HNSW_EF_CONSTRUCTION", 128)),
+    "maxConnections": int(os.environ.get("WEAVIATE_HNSW_MAX_CONNECTIONS", 32)),
+    "rescoreLimit": int(os.environ.get("WEAVIATE_RESCORE_LIMIT", 200)),
+}
+WEAVIATE_QUANTIZATION_OPTIONS = {
+    "none": {},
+    "pq": {
+        "enabled": True,
+        "segments": 0,  # 0 lets Weaviate derive the segment count from the vector dimensions
+        "centroids": 256,
+        "trainingLimit": 100000
+    },
+    "bq": {
+        "enabled": True,
+        "cache": True
+    },
+    "sq": {
+        "enabled": True,
+        "cache": True,
+        "trainingLimit": 100000
+    },
 }
 LLM_CONFIG = {
     "provider": "ollama",
     "model": "llama3.2",
-    "api_endpoint": "http://host.docker.internal:11434"
+    "api_endpoint": "http://host.docker.internal:11434",
+    # client-side settings used by OllamaLLMSPAdapter (api_endpoint is the address seen from Weaviate)
+    "host": os.environ.get("OLLAMA_HOST", "http://localhost:11434"),
+    "num_parallel": int(os.environ.get("OLLAMA_NUM_PARALLEL", 4)),  # keep in sync with the Ollama server
+    "timeout": float(os.environ.get("OLLAMA_TIMEOUT", 120)),  # seconds per request
+    "max_retries": 3,
+    "retry_backoff": 1.0,  # seconds, doubled on every retry
+    "retry_backoff_max": 30.0,
+    # how long Ollama keeps a model loaded after a request; avoids reload stalls between queries
+    "keep_alive": os.environ.get("OLLAMA_KEEP_ALIVE", "30m"),
+    # default generation options, see https://github.com/ollama/ollama/blob/main/docs/modelfile.md#parameter
+    "options": {
+        "num_ctx": 8192,
+        "num_predict": 512,
+        "temperature": 0.1
+    }
+}
+# Per-task model and generation options. Entity extraction produces a short list,
+# so it can run on a smaller model (LLM_ENTITY_MODEL) with a small context and output cap.
+# Ollama reloads a model's runner whenever num_ctx changes, so tasks sharing a model must
+# use the same context size: the small context is only the default on a model of its own,
+# and rag.warm_up() warns about tasks that share a model with different num_ctx.
+_ENTITY_MODEL = os.environ.get("LLM_ENTITY_MODEL", LLM_CONFIG["model"])
+_ANSWER_MODEL = os.environ.get("LLM_ANSWER_MODEL", LLM_CONFIG["model"])
+_ANSWER_NUM_CTX = 8192
+LLM_TASK_CONFIG = {
+    "entity_resolution": {
+        "model": _ENTITY_MODEL,
+        "options": {
+            "num_ctx": 2048 if _ENTITY_MODEL != _ANSWER_MODEL else _ANSWER_NUM_CTX,
+            "num_predict": 64,
+            "temperature": 0.0
+        }
+    },
+    "answer_generation": {
+        "model": _ANSWER_MODEL,
+        "options": {
+            "num_ctx": _ANSWER_NUM_CTX,
+            "num_predict": 512,
+            "temperature": 0.1
+        }
+    }
 }
 LLM_SYSTEM_MESSAGES = {
     "entity_resolution": "You are an Entity Extraction Assistant whose task is to extract all meaningful entities from a given question or text prompt. Entities may include named entities (people, places, organizations, countries, dates, numbers, etc.), domain-specific concepts (such as “capital city,” “GDP,” “machine learning,” “climate change”), and compound phrases (multi-word terms like “New York City,” “capital city,” “prime minister”). Return the extracted entities as a list of strings, preserving the exact wording as it appears in the text without adding extra words or paraphrasing. If no clear entity exists, return an empty list. If the prompt is 'What is the capital of France?', the response should be ['capital', 'France']. Please do not provide any answers or explanations, only the list of entities.",
@@ -61,5 +153,127 @@ LLM_SYSTEM_MESSAGES = {
         "If the answer is not present in the passages, reply: 'Not found in provided context.' Cite the source for each fact you use.\n"
     )
 }
+# PDF text extraction used by index_invoker.py. "tiered" reads the text layer with
+# pypdf and only sends pages that need layout analysis (scanned, little text,
+# table-heavy) through unstructured's hi_res pipeline; "hi_res" partitions every page.
+PDF_EXTRACTION_CONFIG = {
+    "strategy": os.environ.get("PDF_EXTRACTION_STRATEGY", "tiered"),
+    "min_text_chars": 200,  # fewer characters on a page -> hi_res
+    "scanned_max_chars": 1000,  # pages with images and less text than this count as scanned
+    "table_line_ratio": 0.3,  # share of tabular-looking lines that marks a page as table-heavy
+    "hi_res_seconds_per_page": 2.0,  # savings estimate when no page of a document took the hi_res path
+    # hi_res pages are partitioned in worker processes, `page_range_size` pages per task
+    "page_range_size": int(os.environ.get("PDF_PAGE_RANGE_SIZE", 25)),
+    "max_workers": int(os.environ.get("PDF_PARTITION_WORKERS", max(1, (os.cpu_count() or 2) // 2))),
+    # resident memory (RSS) cap per worker process, including the loaded layout models
+    # (0 = unlimited); also limits the pool to available memory. With a cap, each page
+    # range runs in a fresh worker and ranges over the cap are retried split in half.
+    "worker_memory_mb": int(os.environ.get("PDF_PARTITION_WORKER_MEMORY_MB", 0))
+}
+# Session-scoped page cache used for follow-up questions (see context_cache.py).
+CONTEXT_CACHE_CONFIG = {
+    "neighbour_window": int(os.environ.get("CONTEXT_CACHE_NEIGHBOUR_WINDOW", 1)),  # prefetch page_number +/- n
+    "max_pages": int(os.environ.get("CONTEXT_CACHE_MAX_PAGES", 256)),
+    "min_term_coverage": 0.6,  # share of query terms a cached page must contain to be reused
+    "prefetch_workers": 2
+}
+# Offline batch question answering (see batch_qa.py). Stage concurrency should
+# match what Ollama (OLLAMA_NUM_PARALLEL) and Weaviate can serve in parallel.
+BATCH_QA_CONFIG = {
+    "extract_workers": int(os.environ.get("BATCH_QA_EXTRACT_WORKERS", 2)),
+    "search_workers": int(os.environ.get("BATCH_QA_SEARCH_WORKERS", 8)),
+    "generate_workers": int(os.environ.get("BATCH_QA_GENERATE_WORKERS", 2)),
+    "queue_size": 64,  # max jobs buffered between two stages
+    "embed_batch_size": 32,  # entity strings embedded per call when a local query embedder is set
+    "query_type": "hybrid",
+    "limit": 3
+}
+# Cold-start budgets: cumulative import time (ms, `python -X importtime`) of the
+# entry modules, checked by appendix/benchmarks/import_time_benchmark.py.
+IMPORT_TIME_BUDGET_MS = {
+    "src.core.rag": 250,
+    "src.core.batch_qa": 300,
+    "src.core.retriver.util.index_lib": 150
+}
+# Answer prompt layout: "prefix_stable" sends the instructions as a fixed system message and
+# the passages (sorted by object id) before the query so Ollama can reuse its KV cache for the
+# shared prefix; "inline" puts instructions, passages and query into one user message.
+PROMPT_LAYOUT = os.environ.get("PROMPT_LAYOUT", "prefix_stable")
+# Clause index built at ingest (see clause_lib.py). Lookup questions (effective date,
+# expiration, termination notice, governing law, renewal) are answered from it without
+# retrieval or generation; set CLAUSE_INDEX_ENABLED=0 to always use full RAG.
+CLAUSE_INDEX_CONFIG = {
+    "enabled": os.environ.get("CLAUSE_INDEX_ENABLED", "1") == "1",
+    "path": os.environ.get("CLAUSE_INDEX_PATH", "/home/kosala/git-repos/contract_inspect/clause_index.json")
+}
+# Duplicate page detection at ingest (see dedup_lib.py). Pages with identical text and
+# effective date are stored once. With `report_near_duplicates`, pages whose word-shingle
+# MinHash similarity reaches `threshold` are counted as near-duplicates (never merged; off by
+# default, it only feeds the report). `bands` x `rows` must equal `num_perm`.
+DEDUP_CONFIG = {
+    "enabled": os.environ.get("DEDUP_ENABLED", "1") == "1",
+    "report_near_duplicates": os.environ.get("DEDUP_REPORT_NEAR_DUPLICATES", "0") == "1",
+    "num_perm": 128,
+    "bands": 16,
+    "rows": 8,  # candidate pairs from ~0.7 similarity
+    "shingle_size": 5,  # words per shingle
+    "threshold": float(os.environ.get("DEDUP_THRESHOLD", 0.85)),
+    "search_overfetch": 2  # searches fetch limit x n results before collapsing duplicates
+}
+# Per-request latency budget (see deadline.py). The estimates seed the expected stage
+# durations and are refined with measured ones; requests that would not fit their deadline
+# are degraded (no entity extraction, fewer passages, BM25, fewer output tokens).
+DEADLINE_CONFIG = {
+    "default_seconds": float(os.environ.get("RAG_DEADLINE_SECONDS", 20)),
+    "estimates": {
+        "entity_extraction": 1.5,
+        "search_hybrid": 0.4,
+        "search_vector": 0.3,
+        "search_bm25": 0.1,
+        "generation_base": 1.0,  # model call overhead and first token
+        "generation_per_passage": 0.3,  # prompt evaluation per passage
+        "generation_per_token": 0.03  # per output token (num_predict)
+    },
+    "latency_smoothing": 0.2,  # EWMA weight of a new measurement
+    "min_limit": 1,
+    "min_num_predict": 64,
+    # queued LLM requests (all lanes) from which degradations always apply / new requests are
+    # rejected; counted in this process's LLMScheduler only, not across processes or the server
+    "degrade_queue_depth": int(os.environ.get("RAG_DEGRADE_QUEUE_DEPTH", 4)),
+    "shed_queue_depth": int(os.environ.get("RAG_SHED_QUEUE_DEPTH", 16))
+}
+# In-process query embedding (see onnx_embedding_adapter.py). Queries are embedded locally
+# with the ONNX export of the collection's vectorizer model and the vector is passed to
+# Weaviate, skipping its call to Ollama. The index itself is still built by text2vec-ollama,
+# so the local model must match it: `parity_min_cosine` is checked against Ollama on load
+# and local embedding is disabled if it fails.
+QUERY_EMBEDDING_CONFIG = {
+    "enabled": os.environ.get("LOCAL_QUERY_EMBEDDING", "1") == "1",
+    "repo_id": "nomic-ai/nomic-embed-text-v1.5",  # what Ollama serves as nomic-embed-text
+    "onnx_file": os.environ.get("QUERY_EMBEDDING_ONNX_FILE", "onnx/model.onnx"),  # or onnx/model_quantized.onnx
+    "ollama_model": WEAVIATE_SCHEMA["moduleConfig"]["text2vec-ollama"]["model"],
+    # text2vec-ollama embeds the raw text, so no "search_query: " task prefix
+    "query_prefix": "",
+    "max_length": 512,  # tokens; queries are short
+    "batch_size": 32,
+    "intra_op_threads": int(os.environ.get("QUERY_EMBEDDING_THREADS", min(4, os.cpu_count() or 1))),
+    "cache_size": 1024,  # recently embedded queries kept in memory
+    "parity_check": os.environ.get("QUERY_EMBEDDING_PARITY_CHECK", "1") == "1",
+    "parity_min_cosine": 0.99,
+    "parity_texts": [
+        "termination notice period",
+        "What is the governing law of the Oracle agreement?",
+        "payment terms net 30 days invoice"
+    ]
+}
+# Collection snapshots (see snapshot_lib.py): objects and their vectors in a zstd-compressed
+# Parquet file, restored with precomputed vectors so no page is partitioned or embedded again.
+SNAPSHOT_CONFIG = {
+    "folder": os.environ.get("SNAPSHOT_FOLDER", "/home/kosala/git-repos/contract_inspect/snapshots/"),
+    "row_group_size": 2000,  # objects buffered per Parquet row group while exporting
+    "compression": "zstd",
+    "compression_level": 3,
+    "insert_batch_size": int(os.environ.get("SNAPSHOT_INSERT_BATCH_SIZE", 500))
+}
 METADATA_CONFIG_PATH = os.environ.get("METADATA_CONFIG_PATH", "/home/kosala/git-repos/contract_inspect/metadata.yml")
 DATA_FOLDER = os.environ.get("DATA_FOLDER", "/home/kosala/git-repos/contract_inspect/data/")
\ No newline at end of file
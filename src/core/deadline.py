@@ -0,0 +1,169 @@
+"""Per-request latency budget for the RAG pipeline.
+
+`Deadline` tracks the time left for one request. `plan_request` compares it
+with the expected cost of each stage (`LatencyEstimates`, seeded from
+DEADLINE_CONFIG and refined with measured durations) and picks the
+degradations needed to fit, in order: skip LLM entity extraction and search
+on the raw query, use BM25 instead of hybrid or vector search, cap
+`num_predict`, lower the retrieval `limit`. Passages go last because they
+carry the answer; output tokens beyond a short answer are mostly unused.
+Under load (many queued LLM requests in this process's scheduler) the cheap
+degradations are applied regardless of the budget. A request that does not
+fit even fully degraded is not started (`fits` is False).
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from src.core.config import DEADLINE_CONFIG
+
+SKIP_ENTITY_EXTRACTION = "skip_entity_extraction"
+LOAD_SHED = "load_shed"
+ENTITY_EXTRACTION_TIMEOUT = "entity_extraction_timeout"
+DEADLINE_EXCEEDED = "deadline_exceeded"
+
+
+class Deadline:
+    """Wall-clock budget of one request, measured with time.monotonic()."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def expired(self) -> bool:
+        return self.remaining() == 0.0
+
+
+class LatencyEstimates:
+    """Expected stage durations, smoothed with measured ones (EWMA).
+
+    Generation is estimated as `generation_base` plus a cost per passage and
+    per output token; measured generations scale that formula rather than
+    replace it, since the passage and token counts change per request.
+    """
+
+    def __init__(
+        self,
+        estimates: dict[str, float] = DEADLINE_CONFIG["estimates"],
+        smoothing: float = DEADLINE_CONFIG["latency_smoothing"],
+    ):
+        self.smoothing = smoothing
+        self._estimates = dict(estimates)
+        self._generation_scale = 1.0
+        self._lock = threading.Lock()
+
+    def get(self, stage: str) -> float:
+        with self._lock:
+            return self._estimates[stage]
+
+    def search(self, query_type: str) -> float:
+        return self.get(f"search_{query_type}")
+
+    def generation(self, passages: int, num_predict: int) -> float:
+        with self._lock:
+            e = self._estimates
+            return self._generation_scale * (
+                e["generation_base"]
+                + e["generation_per_passage"] * passages
+                + e["generation_per_token"] * num_predict
+            )
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._estimates[stage] += self.smoothing * (seconds - self._estimates[stage])
+
+    def observe_generation(self, seconds: float, passages: int, num_predict: int) -> None:
+        # num_predict is an upper bound, so this overestimates short answers; erring long is safer
+        expected = self.generation(passages, num_predict) / self._generation_scale
+        with self._lock:
+            self._generation_scale += self.smoothing * (seconds / expected - self._generation_scale)
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        start = time.monotonic()
+        yield
+        self.observe(stage, time.monotonic() - start)
+
+
+@dataclass
+class RequestPlan:
+    """How a request runs within its deadline, and what was given up for it."""
+
+    use_entity_extraction: bool
+    query_type: str
+    limit: int
+    num_predict: int
+    degradations: list[str] = field(default_factory=list)
+    # False if even the most degraded plan is expected to exceed the deadline
+    fits: bool = True
+
+    def expected_seconds(self, estimates: LatencyEstimates) -> float:
+        return (
+            (estimates.get("entity_extraction") if self.use_entity_extraction else 0.0)
+            + estimates.search(self.query_type)
+            + estimates.generation(self.limit, self.num_predict)
+        )
+
+
+def plan_request(
+    deadline: Deadline,
+    query_type: str,
+    limit: int,
+    num_predict: int,
+    *,
+    loaded: bool = False,
+    estimates: LatencyEstimates,
+    config: dict = DEADLINE_CONFIG,
+) -> RequestPlan:
+    """Degrade the request until its expected duration fits the remaining time.
+
+    Args:
+        deadline (Deadline): The request's budget.
+        query_type (str): Requested search type ("bm25", "vector" or "hybrid").
+        limit (int): Requested number of passages.
+        num_predict (int): Requested cap on generated tokens.
+        loaded (bool): The LLM queue is long; skip entity extraction and use
+            BM25 even if the budget would allow more.
+        estimates (LatencyEstimates): Expected stage durations.
+        config (dict): `min_limit` and `min_num_predict`, see DEADLINE_CONFIG.
+    """
+    plan = RequestPlan(True, query_type, limit, num_predict)
+    remaining = deadline.remaining()
+
+    def over_budget() -> bool:
+        return plan.expected_seconds(estimates) > remaining
+
+    if loaded or over_budget():
+        plan.use_entity_extraction = False
+        plan.degradations.append(SKIP_ENTITY_EXTRACTION)
+    if (loaded or over_budget()) and plan.query_type != "bm25":
+        plan.query_type = "bm25"
+        plan.degradations.append(f"query_type:{query_type}->bm25")
+    if over_budget():
+        # whatever time is left after the other stages goes to output tokens
+        plan.num_predict = 0
+        per_token = estimates.generation(0, 1) - estimates.generation(0, 0)
+        spare = remaining - plan.expected_seconds(estimates)
+        tokens = int(spare / per_token) if per_token > 0 else num_predict
+        plan.num_predict = max(config["min_num_predict"], min(num_predict, tokens))
+        if plan.num_predict != num_predict:
+            plan.degradations.append(f"num_predict:{num_predict}->{plan.num_predict}")
+    while over_budget() and plan.limit > config["min_limit"]:
+        plan.limit -= 1
+    if plan.limit != limit:
+        plan.degradations.append(f"limit:{limit}->{plan.limit}")
+    if over_budget():
+        # starting would only occupy the LLM with an answer nobody waits for
+        plan.fits = False
+        plan.degradations.append(DEADLINE_EXCEEDED)
+    return plan
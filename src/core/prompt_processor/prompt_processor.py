@@ -6,6 +6,7 @@ this module should call `get_llm_adapter()` to obtain the adapter; that
 function raises a clear error if the adapter was not initialized.
 """
 
+from dataclasses import dataclass, field
 from typing import Any, Optional
 import logging
 # Module-level variable. Use get_llm_adapter() to access safely.
@@ -35,16 +36,24 @@ def clear_llm_adapter() -> None:
     global llm_sp_adapter
     llm_sp_adapter = None
     
-def _invoke_llm_and_get_content(prompt: str, system_message: str=None) -> str:
+def warm_up(models: Optional[list[str]] = None, options: Optional[dict[str, dict]] = None) -> None:
+    """Ask the LLM adapter to preload `models` (e.g. at service startup) with their `options`."""
+    get_llm_adapter().warm_up(models, options)
+
+def _invoke_llm_and_get_content(prompt: str, system_message: str=None, **llm_kwargs: Any) -> str:
     """Helper to invoke LLM and return the content from the response."""
     llm_adapter = get_llm_adapter()
-    response = llm_adapter.invoke_llm(prompt=prompt, system_message=system_message)
+    response = llm_adapter.invoke_llm(prompt=prompt, system_message=system_message, **llm_kwargs)
     return response['message']['content']
 
-def extract_entities(prompt: str, system_message: str) -> str:
-    """Extract entities from the given prompt using the LLM adapter."""
+def extract_entities(prompt: str, system_message: str, **llm_kwargs: Any) -> str:
+    """Extract entities from the given prompt using the LLM adapter.
+
+    Extra keyword arguments (e.g. `model`, `options`, `keep_alive`) are passed
+    to the adapter's `invoke_llm`.
+    """
     logger.debug("extract_entities called with prompt: %s", prompt)
-    return _invoke_llm_and_get_content(prompt, system_message)
+    return _invoke_llm_and_get_content(prompt, system_message, **llm_kwargs)
 
 def create_query_context(passages: list[str], query: str, instructions: str) -> str:
     """
@@ -68,16 +77,160 @@ def create_query_context(passages: list[str], query: str, instructions: str) ->
     prompt = f"{instructions}\n{context}\n\nUser Query:\n{query}"
     return prompt
 
-def generate_answer(prompt: str) -> str:
+def generate_answer(prompt: str, **llm_kwargs: Any) -> str:
     """Generate an answer from the given prompt using the LLM adapter.
 
     Args:
         prompt: The user-facing prompt or instruction to send to the LLM.
-        system_message: The system message to include in the request.
+        **llm_kwargs: Passed to the adapter's `invoke_llm` (e.g. `model`,
+            `options`, `keep_alive`).
 
     Returns:
         The text response produced by the LLM.
     """
-    """Generate an answer from the given prompt using the LLM adapter."""
     logger.debug("generate_answer called with prompt: %s", prompt)
-    return _invoke_llm_and_get_content(prompt)
+    return _invoke_llm_and_get_content(prompt, **llm_kwargs)
+
+# ---- Prefix-stable prompts and KV-cache reuse ----
+#
+# Ollama keeps the KV cache of the last prompt per model slot and only
+# evaluates the part of a new prompt after the longest shared prefix. Putting
+# the fixed instructions in the system message, passages in a stable order
+# and the query last maximises that shared prefix between consecutive
+# questions. Follow-up questions in a PromptSession go further and continue
+# from the previous response's token context.
+
+@dataclass
+class PromptEvalStats:
+    """Prompt evaluation cost of one request as reported by the LLM."""
+
+    prompt_eval_count: int
+    prompt_eval_seconds: float
+    reused_tokens: int = 0
+    seconds_saved: float = 0.0
+
+@dataclass
+class PromptSession:
+    """LLM state for a series of follow-up questions on the same passages.
+
+    Attributes:
+        system_message: Fixed instructions, sent once at the start.
+        context: Token context returned by the last response.
+        sent_passage_ids: Passages already part of `context`.
+        history: PromptEvalStats of every request in the session.
+        max_context_tokens: Start over once `context` grows beyond this
+            (keep it below the model's num_ctx so nothing gets truncated).
+    """
+
+    system_message: str
+    max_context_tokens: Optional[int] = None
+    context: list[int] = field(default_factory=list)
+    sent_passage_ids: set[str] = field(default_factory=set)
+    history: list[PromptEvalStats] = field(default_factory=list)
+
+    def seconds_saved(self) -> float:
+        return sum(s.seconds_saved for s in self.history)
+
+# Rough size of an English prompt token, used to estimate the cold prompt
+# length when the LLM only reports the tokens it actually evaluated.
+_CHARS_PER_TOKEN = 4
+
+def create_prefix_stable_context(passages: list[tuple[str, str]], query: str, heading: str = "Passages:") -> str:
+    """Build the user message for a prefix-stable prompt.
+
+    Args:
+        passages: (passage_id, text) pairs; they are sorted by id so the same
+            set of passages always renders to the same text.
+        query: The user query, placed last.
+        heading: Title of the passage block.
+
+    Returns:
+        The passages followed by the user query.
+    """
+    context_lines = [heading]
+    if not passages:
+        context_lines.append("(no passages found)")
+    else:
+        for i, (_, text) in enumerate(sorted(passages, key=lambda p: p[0]), 1):
+            context_lines.append(f"{i}. {text.strip()}")
+    context = "\n".join(context_lines)
+    return f"{context}\n\nUser Query:\n{query}"
+
+def _prompt_eval(response: Any) -> tuple[int, float]:
+    count = response.get("prompt_eval_count") or 0
+    duration_ns = response.get("prompt_eval_duration") or 0
+    return count, duration_ns / 1e9
+
+def generate_answer_with_stable_prefix(
+    passages: list[tuple[str, str]],
+    query: str,
+    system_message: str,
+    **llm_kwargs: Any
+) -> str:
+    """Answer with a fixed system message, id-sorted passages and the query last.
+
+    Ollama's `prompt_eval_count` only covers tokens it did not find in its KV
+    cache. The reused prefix is estimated as the difference to a cold
+    evaluation of the whole prompt (its length at `_CHARS_PER_TOKEN`), so the
+    logged saving is an estimate, not a measurement.
+    """
+    prompt = create_prefix_stable_context(passages, query)
+    response = get_llm_adapter().invoke_llm(prompt=prompt, system_message=system_message, **llm_kwargs)
+
+    count, seconds = _prompt_eval(response)
+    cold_tokens = (len(system_message) + len(prompt)) // _CHARS_PER_TOKEN
+    reused_tokens = max(cold_tokens - count, 0)
+    stats = PromptEvalStats(
+        prompt_eval_count=count,
+        prompt_eval_seconds=seconds,
+        reused_tokens=reused_tokens,
+        seconds_saved=reused_tokens * seconds / count if count else 0.0,
+    )
+    logger.info(
+        "prompt_eval: %d tokens in %.3fs, ~%d cached prefix tokens (est.), ~%.3fs saved (est.)",
+        stats.prompt_eval_count, stats.prompt_eval_seconds, stats.reused_tokens, stats.seconds_saved
+    )
+    return response['message']['content']
+
+def generate_answer_in_session(
+    session: PromptSession,
+    passages: list[tuple[str, str]],
+    query: str,
+    **llm_kwargs: Any
+) -> str:
+    """Answer a (follow-up) question, continuing from the session's KV state.
+
+    Only passages not yet sent in this session are added to the prompt; the
+    instructions and earlier passages are already part of `session.context`.
+    """
+    if session.max_context_tokens and len(session.context) > session.max_context_tokens:
+        session.context = []
+        session.sent_passage_ids.clear()
+    new_passages = [p for p in passages if p[0] not in session.sent_passage_ids]
+    first_turn = not session.context
+    prompt = create_prefix_stable_context(
+        new_passages, query, heading="Passages:" if first_turn else "Additional passages:"
+    )
+    reused_tokens = len(session.context)
+    response = get_llm_adapter().invoke_llm(
+        prompt=prompt,
+        system_message=session.system_message if first_turn else None,
+        context=session.context,
+        **llm_kwargs
+    )
+    session.context = list(response.get("context") or [])
+    session.sent_passage_ids.update(p[0] for p in new_passages)
+
+    count, seconds = _prompt_eval(response)
+    stats = PromptEvalStats(
+        prompt_eval_count=count,
+        prompt_eval_seconds=seconds,
+        reused_tokens=reused_tokens,
+        seconds_saved=reused_tokens * seconds / count if count else 0.0,
+    )
+    session.history.append(stats)
+    logger.info(
+        "prompt_eval: %d tokens in %.3fs, %d context tokens reused, ~%.3fs saved",
+        stats.prompt_eval_count, stats.prompt_eval_seconds, stats.reused_tokens, stats.seconds_saved
+    )
+    return response['response']
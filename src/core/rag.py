@@ -2,58 +2,359 @@ import sys
 
 sys.path.append("/home/kosala/git-repos/contract_inspect/")
 sys.path.append("/home/kosala/git-repos/contract_inspect/src")
+import logging
+import time
 import yaml
-from core.retriver.util import search_lib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+from src.core import deadline as deadline_lib
+from src.core.retriver.util import clause_lib, search_lib
+from src.core.retriver.util.context_cache import SessionContextCache
 from sp_adapters.weaviate_adapter import WeaviateVectorDBAdapter
 from core.config import METADATA_CONFIG_PATH
-from core.retriver.util.search_lib import weaviate_search, add_metadata_filters
 from src.core.prompt_processor import prompt_processor
 from src.sp_adapters.ollama_llm_sp_adapter import OllamaLLMSPAdapter
-from core.config import LLM_SYSTEM_MESSAGES
+from core.config import LLM_SYSTEM_MESSAGES, LLM_TASK_CONFIG, PROMPT_LAYOUT
+from core.config import DEADLINE_CONFIG, QUERY_EMBEDDING_CONFIG
+from src.core.spi.vector_db_spi import FilterSpec, SearchResult
 
-def invoke_rag(query: str, query_type: str, collection: str, limit: int) -> any:
-    metadata_config = yaml.safe_load(open(METADATA_CONFIG_PATH))
+logger = logging.getLogger(__name__)
 
-    # invoke llm to extract entities from the query
-    prompt_processor.init(OllamaLLMSPAdapter())
+# stage durations measured across requests, used to plan within a deadline
+latency_estimates = deadline_lib.LatencyEstimates()
+# runs deadline-bound searches so the caller can stop waiting at the deadline
+_search_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rag-search")
+
+@dataclass
+class RagResponse:
+    """Answer of a deadline-bound request and what was given up to meet it."""
+    answer: Optional[str]
+    answered_from: Optional[str] = None  # "clause_index" or "rag"; None if shed or timed out
+    degradations: list[str] = field(default_factory=list)
+    query_type: Optional[str] = None
+    limit: Optional[int] = None
+    sources: list[dict] = field(default_factory=list)
+    elapsed_seconds: float = 0.0
+    deadline_seconds: Optional[float] = None
+    error: Optional[str] = None
+
+def extract_query_entities(query: str, **llm_kwargs) -> str:
+    """Extract the search entities from the query with the LLM.
+
+    The prompt processor must already be initialized with an LLM adapter.
+    Extra keyword arguments (e.g. `timeout`) are passed to the adapter.
+    """
     extracted_entities = prompt_processor.extract_entities(
         prompt=query,
-        system_message=LLM_SYSTEM_MESSAGES['entity_resolution']
+        system_message=LLM_SYSTEM_MESSAGES['entity_resolution'],
+        **{**LLM_TASK_CONFIG['entity_resolution'], **llm_kwargs}
     )
-    extracted_entities = "".join(extracted_entities)
-    
-    # call weaviate to search for relevant documents
-    # initialize vector db client
-    weaviate_adapter = WeaviateVectorDBAdapter()
-    weaviate_adapter.connect()
-    search_lib.init(adapter=weaviate_adapter)
-
-    # perform the search
-    results = search_lib.weaviate_search(
-        query=extracted_entities,
-        type=query_type,
-        collection=collection,
-        limit=limit,
-        filters=search_lib.add_metadata_filters(
-            metadata_config["metadata_filter_config"]
-        )
+    return "".join(extracted_entities)
+
+def _passages(hits: list[SearchResult]) -> list[tuple[str, str]]:
+    # (stable object id, text) pairs for the prefix-stable prompt layout
+    passages = []
+    for h in hits:
+        content = (h.properties or {}).get("content")
+        if isinstance(content, str):
+            passages.append((str(h.id) if h.id is not None else content, content))
+    return passages
+
+def new_prompt_session() -> prompt_processor.PromptSession:
+    """Start a prompt session whose follow-up answers reuse the LLM's KV state."""
+    num_ctx = LLM_TASK_CONFIG['answer_generation']['options']['num_ctx']
+    return prompt_processor.PromptSession(
+        system_message=LLM_SYSTEM_MESSAGES['query_context_instructions'],
+        # leave room for the next passages, query and answer
+        max_context_tokens=int(num_ctx * 0.6)
     )
-    weaviate_adapter.close()
-    search_lib.clear_vector_db_adapter()
-    
+
+def generate_rag_answer(
+    query: str,
+    hits: list[SearchResult],
+    prompt_session: Optional[prompt_processor.PromptSession] = None,
+    **llm_kwargs
+) -> str:
+    """Answer the query from the retrieved hits with the LLM.
+
+    Extra keyword arguments (e.g. `timeout`) are passed to the adapter;
+    `options` are merged over the answer_generation options.
+    """
+    task_config = LLM_TASK_CONFIG['answer_generation']
+    task_config = {
+        **task_config,
+        **llm_kwargs,
+        'options': {**task_config['options'], **llm_kwargs.get('options', {})}
+    }
+    if prompt_session is not None:
+        return prompt_processor.generate_answer_in_session(
+            prompt_session, _passages(hits), query, **task_config
+        )
+    if PROMPT_LAYOUT == "prefix_stable":
+        return prompt_processor.generate_answer_with_stable_prefix(
+            _passages(hits),
+            query,
+            LLM_SYSTEM_MESSAGES['query_context_instructions'],
+            **task_config
+        )
     # construct the prompt for final answer generation
     augmented_prompt = prompt_processor.create_query_context(
-        passages=results,
+        passages=search_lib.result_contents(hits),
         query=query,
         instructions=LLM_SYSTEM_MESSAGES['query_context_instructions']
     )
-    
     # answer generation using llm
-    results = prompt_processor.generate_answer(
-        prompt=augmented_prompt
+    return prompt_processor.generate_answer(
+        prompt=augmented_prompt,
+        **task_config
     )
-    return results
+
+def init_query_embedding() -> bool:
+    """Embed search queries in-process if enabled and in parity with Ollama.
+
+    Falls back to Weaviate's vectorizer (returns False) when disabled, when
+    the model cannot be loaded or when its vectors differ from Ollama's.
+    """
+    if not QUERY_EMBEDDING_CONFIG["enabled"]:
+        return False
+    from src.sp_adapters import onnx_embedding_adapter
+    try:
+        embedder = onnx_embedding_adapter.OnnxEmbeddingAdapter().load()
+        if QUERY_EMBEDDING_CONFIG["parity_check"] and not onnx_embedding_adapter.verify_parity(embedder):
+            return False
+    except Exception as e:
+        logger.warning("Local query embedding unavailable, using the vectorizer: %s", e)
+        return False
+    search_lib.init_query_embedder(embedder)
+    return True
+
+def warm_up() -> None:
+    """Preload the entity extraction and answer models at service startup.
+
+    The prompt processor must already be initialized with an LLM adapter.
+    Tasks sharing a model with different num_ctx are reported, since Ollama
+    reloads the model whenever a request switches between them.
+    """
+    options: dict[str, dict] = {}
+    for name, task in LLM_TASK_CONFIG.items():
+        loaded = options.setdefault(task["model"], task["options"])
+        if loaded.get("num_ctx") != task["options"].get("num_ctx"):
+            logger.warning(
+                "LLM_TASK_CONFIG: %s uses num_ctx %s on %s, which another task loads with num_ctx %s; "
+                "Ollama will reload the model between them",
+                name, task["options"].get("num_ctx"), task["model"], loaded.get("num_ctx")
+            )
+    prompt_processor.warm_up(sorted(options), options)
+
+def invoke_rag(
+    query: str,
+    query_type: str,
+    collection: str,
+    limit: int,
+    session: Optional[SessionContextCache] = None,
+    prompt_session: Optional[prompt_processor.PromptSession] = None,
+    use_clause_index: bool = True
+) -> any:
+    """Answer `query` from the indexed contracts.
+
+    Lookup questions (effective date, expiration, termination notice,
+    governing law, renewal) are answered from the clause index built at
+    ingest when it has the field; everything else goes through retrieval and
+    generation. Pass the same `session` for consecutive questions about one
+    agreement to reuse (and prefetch) pages retrieved by earlier questions,
+    and the same `prompt_session` (see new_prompt_session()) to continue from
+    the LLM's KV state of the previous answer.
+    """
+    if use_clause_index:
+        start = time.perf_counter()
+        clause_answer = clause_lib.answer_from_clauses(query)
+        if clause_answer is not None:
+            logger.info(
+                "Answered %s of %s from the clause index in %.1f ms",
+                clause_answer.field, clause_answer.document, (time.perf_counter() - start) * 1000
+            )
+            return clause_answer.answer
+
+    metadata_config = yaml.safe_load(open(METADATA_CONFIG_PATH))
+
+    # invoke llm to extract entities from the query
+    prompt_processor.init(OllamaLLMSPAdapter())
+    extracted_entities = extract_query_entities(query)
     
+    filters = search_lib.add_metadata_filters(
+        metadata_config["metadata_filter_config"]
+    )
+    results = _retrieve(extracted_entities, query_type, collection, limit, filters, session)
+    return generate_rag_answer(query, results, prompt_session)
+
+def _retrieve(
+    search_query: str,
+    query_type: str,
+    collection: str,
+    limit: int,
+    filters: FilterSpec,
+    session: Optional[SessionContextCache] = None
+) -> list[SearchResult]:
+    if session is not None:
+        # the session keeps its connection open between questions
+        search_lib.init(adapter=session.adapter)
+        results = session.retrieve(
+            query=search_query,
+            type=query_type,
+            limit=limit,
+            filters=filters
+        )
+    else:
+        # call weaviate to search for relevant documents
+        # initialize vector db client
+        weaviate_adapter = WeaviateVectorDBAdapter()
+        weaviate_adapter.connect()
+        search_lib.init(adapter=weaviate_adapter)
+
+        # perform the search
+        results = search_lib.weaviate_search_results(
+            query=search_query,
+            type=query_type,
+            collection=collection,
+            limit=limit,
+            filters=filters
+        )
+        weaviate_adapter.close()
+        search_lib.clear_vector_db_adapter()
+    return results
+
+def _llm_queue_depth() -> int:
+    # requests waiting for an LLM slot, if the adapter exposes scheduler metrics
+    metrics = getattr(prompt_processor.get_llm_adapter(), "metrics", None)
+    return metrics()["queue_depth"] if metrics is not None else 0
+
+def _sources(hits: list[SearchResult]) -> list[dict]:
+    return [
+        {"document": h.properties.get("document"), "page_number": h.properties.get("page_number")}
+        for h in hits
+    ]
+
+def invoke_rag_with_deadline(
+    query: str,
+    query_type: str,
+    collection: str,
+    limit: int,
+    deadline_seconds: float = DEADLINE_CONFIG["default_seconds"],
+    session: Optional[SessionContextCache] = None,
+    prompt_session: Optional[prompt_processor.PromptSession] = None
+) -> RagResponse:
+    """Answer `query` within `deadline_seconds`, degrading quality if needed.
+
+    Same pipeline as invoke_rag(), planned against the remaining budget with
+    deadline.plan_request(): entity extraction is skipped (the raw query is
+    searched), BM25 used instead of hybrid/vector search, `num_predict` capped
+    and `limit` lowered as needed; a request that would not fit even then is
+    not started. With `shed_queue_depth` LLM requests queued in this
+    process's scheduler (not server-wide) the request is rejected right away;
+    from `degrade_queue_depth` the cheap degradations always apply. LLM calls
+    and the search time out with the deadline; a timed-out entity extraction
+    falls back to the raw query.
+
+    Returns:
+        RagResponse: The answer (None if shed or out of time) and the
+        degradations that were applied.
+    """
+    deadline = deadline_lib.Deadline(deadline_seconds)
+
+    def respond(answer: Optional[str], answered_from: Optional[str], **kwargs) -> RagResponse:
+        return RagResponse(
+            answer=answer,
+            answered_from=answered_from,
+            elapsed_seconds=deadline.elapsed(),
+            deadline_seconds=deadline_seconds,
+            **kwargs
+        )
+
+    clause_answer = clause_lib.answer_from_clauses(query)
+    if clause_answer is not None:
+        return respond(
+            clause_answer.answer,
+            "clause_index",
+            sources=[{"document": clause_answer.document, "page_number": clause_answer.clause.get("page_number")}]
+        )
+
+    prompt_processor.init(OllamaLLMSPAdapter())
+    queue_depth = _llm_queue_depth()
+    if queue_depth >= DEADLINE_CONFIG["shed_queue_depth"]:
+        logger.warning("Shedding query: %d LLM requests queued", queue_depth)
+        return respond(
+            None, None,
+            degradations=[deadline_lib.LOAD_SHED],
+            error=f"overloaded: {queue_depth} LLM requests queued"
+        )
+
+    num_predict = LLM_TASK_CONFIG['answer_generation']['options']['num_predict']
+    plan = deadline_lib.plan_request(
+        deadline,
+        query_type,
+        limit,
+        num_predict,
+        loaded=queue_depth >= DEADLINE_CONFIG["degrade_queue_depth"],
+        estimates=latency_estimates
+    )
+    degradations = plan.degradations
+    if not plan.fits:
+        return respond(
+            None, None,
+            degradations=degradations,
+            error=f"deadline too short: {plan.expected_seconds(latency_estimates):.1f}s expected, "
+                  f"{deadline.remaining():.1f}s left",
+            query_type=plan.query_type,
+            limit=plan.limit
+        )
+
+    search_query = query
+    if plan.use_entity_extraction:
+        try:
+            with latency_estimates.measure("entity_extraction"):
+                search_query = extract_query_entities(query, timeout=deadline.remaining())
+        except TimeoutError:
+            degradations.append(deadline_lib.ENTITY_EXTRACTION_TIMEOUT)
+
+    metadata_config = yaml.safe_load(open(METADATA_CONFIG_PATH))
+    filters = search_lib.add_metadata_filters(metadata_config["metadata_filter_config"])
+    search = _search_executor.submit(
+        _retrieve, search_query, plan.query_type, collection, plan.limit, filters, session
+    )
+    try:
+        # the search itself cannot be cancelled; it finishes in the background
+        with latency_estimates.measure(f"search_{plan.query_type}"):
+            hits = search.result(timeout=deadline.remaining())
+    except TimeoutError:
+        degradations.append(deadline_lib.DEADLINE_EXCEEDED)
+        return respond(
+            None, None, degradations=degradations, error="deadline exceeded during retrieval",
+            query_type=plan.query_type, limit=plan.limit
+        )
+
+    response_fields = dict(query_type=plan.query_type, limit=plan.limit, sources=_sources(hits))
+    if latency_estimates.generation(len(hits), plan.num_predict) > deadline.remaining():
+        # a slow search left too little time for the planned answer
+        degradations.append(deadline_lib.DEADLINE_EXCEEDED)
+        return respond(None, None, degradations=degradations, error="deadline exceeded before generation", **response_fields)
+    try:
+        start = time.monotonic()
+        answer = generate_rag_answer(
+            query,
+            hits,
+            prompt_session,
+            options={'num_predict': plan.num_predict},
+            timeout=deadline.remaining()
+        )
+        latency_estimates.observe_generation(time.monotonic() - start, len(hits), plan.num_predict)
+    except TimeoutError:
+        degradations.append(deadline_lib.DEADLINE_EXCEEDED)
+        return respond(None, None, degradations=degradations, error="deadline exceeded during generation", **response_fields)
+    if degradations:
+        logger.info("Answered within %.1fs with degradations: %s", deadline_seconds, ", ".join(degradations))
+    return respond(answer, "rag", degradations=degradations, **response_fields)
+
 
 if __name__ == "__main__":
     query = "what is oracle open source agreement?"
@@ -61,6 +362,9 @@ if __name__ == "__main__":
     collection = "Page"
     limit = 2
     metadata_config = yaml.safe_load(open(METADATA_CONFIG_PATH))
-    
+
+    prompt_processor.init(OllamaLLMSPAdapter())
+    warm_up()
+    init_query_embedding()
     results = invoke_rag(query, type, collection, limit)
     print("results:", results)
\ No newline at end of file
@@ -1,11 +1,14 @@
 import sys
 sys.path.append("/home/kosala/git-repos/contract_inspect/")
-import weaviate
 from pathlib import Path
 from src.core.retriver.util import index_lib 
 from src.core.retriver.util.index_lib import ContentExtractor
-from src.core.config import WEAVIATE_SCHEMA
-from src.core.config import DATA_FOLDER, METADATA_CONFIG_PATH
+from src.core.retriver.util import extraction_lib
+from src.core.retriver.util.clause_lib import ClauseExtractor, ClauseStore
+from src.core.retriver.util.dedup_lib import PageDeduplicator
+from src.core.config import WEAVIATE_SCHEMA, WEAVIATE_VECTOR_INDEX_CONFIG
+from src.core.config import DATA_FOLDER, METADATA_CONFIG_PATH, PDF_EXTRACTION_CONFIG
+from src.core.config import CLAUSE_INDEX_CONFIG, DEDUP_CONFIG
 from src.sp_adapters.weaviate_adapter import WeaviateVectorDBAdapter
 import yaml
 
@@ -17,28 +20,56 @@ if __name__ == "__main__":
     weaviate_adapter.connect()
     index_lib.init(adapter=weaviate_adapter)
     # create schema : delete the schema before creating it
-    index_lib.create_schema(WEAVIATE_SCHEMA)
+    index_lib.create_schema(WEAVIATE_SCHEMA, WEAVIATE_VECTOR_INDEX_CONFIG)
 
+    reports = []
+    # rebuilt together with the collection
+    clause_store = ClauseStore(CLAUSE_INDEX_CONFIG["path"])
+    # pages are stored after all documents are read so shared text is stored once
+    deduplicator = PageDeduplicator()
+    pages = []
     for agreenment_metadata in config.get("service_agreements"):
         path = Path(DATA_FOLDER, agreenment_metadata.get("file_name"))
 
         # partition the pdf to create a flexible data structure for indexing
         print(f"Processing {path.name}...")
-        elements = index_lib.partition_pdf(
-            filename=path,
-            infer_table_structure=True,
-            include_page_breaks=False,
-            unique_element_ids=True
-        )
+        if PDF_EXTRACTION_CONFIG["strategy"] == "tiered":
+            # text layer first, hi_res layout analysis only where needed
+            elements, report = extraction_lib.extract_pdf_elements(path)
+            reports.append(report)
+            content_extractor = ContentExtractor(path, agreenment_metadata, use_page_breaks=True)
+        else:
+            # every page through hi_res, large documents split into parallel page ranges
+            elements = extraction_lib.partition_pdf_with_page_breaks(path)
+            content_extractor = ContentExtractor(path, agreenment_metadata, use_page_breaks=True)
 
         # extract content from the partitioned elements
-        content_extractor = ContentExtractor(path, agreenment_metadata)
         content_extractor.consume_elements(elements)
 
-        # store the extracted content in Vector DB
-        index_lib.store_data_in_vector_db(
-            content_extractor.get_processed_content(),
-            WEAVIATE_SCHEMA["class"]
-        )   
+        # extract the clause fields answered without retrieval (effective date, governing law, ...)
+        clause_extractor = ClauseExtractor(path, agreenment_metadata)
+        clause_extractor.consume_pages(content_extractor.get_processed_content())
+        clause_store.put(clause_extractor.get_record())
+
+        if DEDUP_CONFIG["enabled"]:
+            # merge duplicate pages (shared boilerplate) with earlier occurrences
+            deduplicator.add(content_extractor.get_processed_content())
+        else:
+            pages.extend(content_extractor.get_processed_content())
+
+    if DEDUP_CONFIG["enabled"]:
+        pages = deduplicator.get_objects()
+        print(deduplicator.report.summary())
+    # store the extracted content in Vector DB
+    index_lib.store_data_in_vector_db(pages, WEAVIATE_SCHEMA["class"])
     weaviate_adapter.close()
-    index_lib.clear_vector_db_adapter()
\ No newline at end of file
+    index_lib.clear_vector_db_adapter()
+    clause_store.save()
+    print(f"Clause index: {len(clause_store)} agreements written to {clause_store.path}")
+
+    if reports:
+        print(
+            f"Extraction: {sum(r.fast_pages for r in reports)} pages via {extraction_lib.FAST_TIER}, "
+            f"{sum(r.layout_pages for r in reports)} via {extraction_lib.LAYOUT_TIER}, "
+            f"~{sum(r.estimated_seconds_saved() for r in reports):.1f}s saved"
+        )
\ No newline at end of file
@@ -0,0 +1,51 @@
+"""Export the indexed collection to a snapshot, or restore it from one.
+
+Usage:
+    python src/core/retriver/snapshot_invoker.py export [--collection Page] [--output snapshots/Page.parquet]
+    python src/core/retriver/snapshot_invoker.py import snapshots/Page.parquet [--collection Page] [--replace]
+"""
+
+import sys
+sys.path.append("/home/kosala/git-repos/contract_inspect/")
+import argparse
+from datetime import datetime
+from pathlib import Path
+from src.core.config import SNAPSHOT_CONFIG, WEAVIATE_SCHEMA
+from src.core.retriver.util import snapshot_lib
+from src.sp_adapters.weaviate_adapter import WeaviateVectorDBAdapter
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snapshot or restore a collection with its vectors.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="write the collection to a Parquet snapshot")
+    export_parser.add_argument("--collection", default=WEAVIATE_SCHEMA["class"])
+    export_parser.add_argument("--output", type=Path, help="snapshot file (default: timestamped file in SNAPSHOT_FOLDER)")
+    import_parser = commands.add_parser("import", help="restore a collection from a Parquet snapshot")
+    import_parser.add_argument("snapshot", type=Path)
+    import_parser.add_argument("--collection", help="target collection (default: the exported one)")
+    import_parser.add_argument("--replace", action="store_true", help="drop an existing collection of that name first")
+    import_parser.add_argument("--batch-size", type=int, default=SNAPSHOT_CONFIG["insert_batch_size"])
+    args = parser.parse_args()
+
+    # initialize vector db client
+    weaviate_adapter = WeaviateVectorDBAdapter()
+    weaviate_adapter.connect()
+    try:
+        if args.command == "export":
+            output = args.output or Path(
+                SNAPSHOT_CONFIG["folder"],
+                f"{args.collection}-{datetime.now().strftime('%Y%m%dT%H%M%S')}.parquet"
+            )
+            report = snapshot_lib.export_collection(weaviate_adapter, args.collection, output)
+            print(report.summary("Exported"))
+        else:
+            report = snapshot_lib.restore_collection(
+                weaviate_adapter,
+                args.snapshot,
+                collection=args.collection,
+                replace=args.replace,
+                batch_size=args.batch_size
+            )
+            print(report.summary("Restored"))
+    finally:
+        weaviate_adapter.close()
@@ -0,0 +1,438 @@
+"""Structured clause index for lookup questions.
+
+Many questions about an agreement are lookups of a single clause — when it
+takes effect or expires, the termination notice period, the governing law,
+the renewal terms. `ClauseExtractor` pulls these fields out of the pages
+produced by `ContentExtractor` at ingest time and merges them with the
+agreement's `service_agreements` entry from metadata.yml. The records are kept
+in a small JSON file (`ClauseStore`), and `answer_from_clauses` answers
+matching questions from it directly, so `rag.invoke_rag` only falls back to
+retrieval and generation for everything else.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Optional
+
+from src.core.config import CLAUSE_INDEX_CONFIG
+
+logger = logging.getLogger(__name__)
+
+CLAUSE_FIELDS = (
+    "effective_date",
+    "expiration_date",
+    "termination_notice",
+    "governing_law",
+    "renewal",
+)
+# metadata.yml keys that are authoritative for a clause field
+_METADATA_FIELDS = {
+    "effective_date": "effective_date",
+    "expiration_date": "expiration_date",
+}
+# agreement metadata kept in the index for document resolution and answers
+_DOCUMENT_KEYS = ("id", "name", "file_name", "provider", "customer", "status")
+
+_MONTHS = {
+    m: i
+    for i, names in enumerate(
+        [
+            ("jan", "january"), ("feb", "february"), ("mar", "march"), ("apr", "april"),
+            ("may",), ("jun", "june"), ("jul", "july"), ("aug", "august"),
+            ("sep", "sept", "september"), ("oct", "october"), ("nov", "november"),
+            ("dec", "december"),
+        ],
+        1,
+    )
+    for m in names
+}
+_MONTH = r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sept?(?:ember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?"
+_DATE = (
+    rf"(?:{_MONTH}\s+\d{{1,2}}(?:st|nd|rd|th)?,?\s+\d{{4}}"  # January 1, 2025
+    rf"|\d{{1,2}}(?:st|nd|rd|th)?\s+(?:day\s+of\s+)?{_MONTH},?\s+\d{{4}}"  # 1 January 2025 / 1st day of January, 2025
+    r"|\d{4}-\d{2}-\d{2}"  # 2025-01-01
+    r"|\d{1,2}/\d{1,2}/\d{4})"  # 01/01/2025 (month first)
+)
+_NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "fourteen": 14, "fifteen": 15, "twenty": 20,
+    "thirty": 30, "forty-five": 45, "forty five": 45, "sixty": 60, "ninety": 90,
+    "one hundred twenty": 120, "one hundred eighty": 180,
+}
+_PERIOD = (
+    r"(?P<number>\d+|" + "|".join(sorted(map(re.escape, _NUMBER_WORDS), key=len, reverse=True)) + r")"
+    r"(?:\s*\(\d+\))?\s*(?:calendar\s+|business\s+)?(?P<unit>days?|months?|weeks?)"
+)
+
+_EXTRACTION_PATTERNS = {
+    "effective_date": re.compile(
+        rf"effective\s+(?:date|as\s+of|on)\b[^.]{{0,80}}?(?P<date>{_DATE})", re.IGNORECASE
+    ),
+    "expiration_date": re.compile(
+        rf"(?:expir\w*|terminat\w*\s+on|end\s+on|until)\b[^.]{{0,80}}?(?P<date>{_DATE})", re.IGNORECASE
+    ),
+    "termination_notice": re.compile(
+        rf"{_PERIOD}['’]?\s+(?:prior\s+|advance\s+)?(?:written\s+)?notice", re.IGNORECASE
+    ),
+    "governing_law": re.compile(
+        r"governed\s+by[^.]{0,60}?laws?\s+of\s+(?:the\s+)?(?P<law>(?:state|commonwealth|province)\s+of\s+[A-Z][\w ]+?|[A-Z][\w ]+?)"
+        r"(?=[,.;(]|\s+(?:without|and|excluding|exclusive)\b)",
+        re.IGNORECASE,
+    ),
+    "renewal": re.compile(r"\b(?:automatically\s+)?renew(?:s|ed|al)?\b", re.IGNORECASE),
+}
+_SENTENCE_RE = re.compile(r"[^.]*?(?:\.(?!\d)|$)", re.DOTALL)
+
+# question -> clause field; a question must match exactly one field to be routed
+_INTENT_PATTERNS = {
+    "effective_date": re.compile(
+        r"\beffective\s+date\b|\bstart\s+date\b|\bcommencement\s+date\b"
+        r"|\bwhen\b.*\b(?:start|begin|commence|take\s+effect|become\s+effective)\b",
+        re.IGNORECASE,
+    ),
+    "expiration_date": re.compile(
+        r"\bexpir\w*\b|\bend\s+date\b|\bwhen\b.*\bend\b", re.IGNORECASE
+    ),
+    "termination_notice": re.compile(
+        r"(?=.*\bterminat\w*)(?:.*\bnotice\s+period\b|.*\bhow\s+(?:much|long|many\s+days)\b.*\bnotice\b)",
+        re.IGNORECASE,
+    ),
+    "governing_law": re.compile(
+        r"\bgoverning\s+law\b|\bgoverned\s+by\b|\bwhich\s+(?:law|jurisdiction)\b",
+        re.IGNORECASE,
+    ),
+    "renewal": re.compile(r"\brenew\w*\b", re.IGNORECASE),
+}
+# only questions asking for a value are lookups; yes/no questions ("Can Oracle
+# terminate ...?") need the passages to be answered correctly
+_LOOKUP_RE = re.compile(r"^\s*(?:what|when|which|how\s+(?:long|much|many))\b", re.IGNORECASE)
+# reasoning, comparisons, conditions and compound questions need the passages
+_NEEDS_RAG_RE = re.compile(
+    r"\b(?:why|explain|compare|summar\w+|differ\w*|all\s+agreements|and|or|if|unless|without"
+    r"|convenience|cause|breach|fees?|penalt\w*|costs?|conditions?|circumstances?)\b",
+    re.IGNORECASE,
+)
+# words next to "agreement"/"contract" that do not name a particular agreement
+_GENERIC_WORDS = {
+    "a", "an", "the", "this", "that", "these", "those", "our", "my", "your", "their", "its",
+    "current", "same", "each", "every", "whole", "entire", "service", "services", "cloud",
+    "master", "license", "licence", "subscription", "framework", "underlying", "which", "any", "all",
+}
+_AGREEMENT_REF_RES = (
+    # "the AWS contract", "Microsoft Azure agreement"
+    re.compile(r"\b([\w&.-]+)\s+(?:agreements?|contracts?|msa|sla)\b", re.IGNORECASE),
+    # "the agreement with Microsoft"
+    re.compile(r"\b(?:with|from|by)\s+([A-Z][\w&.-]*)"),
+)
+# capitalised words after the first one ("When does AWS expire?", "the Google Cloud terms")
+_CAPITALISED_RE = re.compile(r"(?<=\s)[A-Z][\w&.-]*")
+# capitalised words that are contract vocabulary (defined terms), not agreement names
+_CLAUSE_WORDS = {
+    "i", "agreement", "agreements", "contract", "contracts", "effective", "expiration", "expiry",
+    "date", "dates", "term", "terms", "termination", "notice", "period", "governing", "law",
+    "jurisdiction", "renewal", "customer", "provider", "supplier", "party", "parties",
+}
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def parse_date(text: str) -> Optional[str]:
+    """Parse a contract date into ISO format, or None if it is not a date."""
+    text = re.sub(r"\s+", " ", text.strip().lower().replace("day of ", "").replace(",", "").replace(".", ""))
+    text = re.sub(r"(\d)(?:st|nd|rd|th)\b", r"\1", text)
+    for fmt in ("%Y-%m-%d", "%m/%d/%Y"):
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            pass
+    parts = text.split()
+    if len(parts) == 3:
+        if parts[0] in _MONTHS:
+            month, day, year = _MONTHS[parts[0]], parts[1], parts[2]
+        elif parts[1] in _MONTHS:
+            day, month, year = parts[0], _MONTHS[parts[1]], parts[2]
+        else:
+            return None
+        try:
+            return date(int(year), month, int(day)).isoformat()
+        except ValueError:
+            return None
+    return None
+
+
+def _sentence_at(text: str, position: int) -> str:
+    for match in _SENTENCE_RE.finditer(text):
+        if match.start() <= position < max(match.end(), match.start() + 1):
+            return " ".join(match.group().split())
+    return ""
+
+
+def _period_in_days(number: str, unit: str) -> int:
+    count = int(number) if number.isdigit() else _NUMBER_WORDS[number.lower()]
+    unit = unit.lower().rstrip("s")
+    return count * {"day": 1, "week": 7, "month": 30}[unit]
+
+
+def _metadata_value(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)
+
+
+class ClauseExtractor:
+    """Extracts clause fields from the processed pages of one agreement.
+
+    The first match of each field wins: definitions usually come before later
+    references to the same clause.
+    """
+
+    def __init__(self, document_path: Path, metadata: dict):
+        """
+        Args:
+            document_path (Path): The source PDF.
+            metadata (dict): The document's entry from metadata.yml.
+        """
+        self.document_path = document_path
+        self.metadata = metadata
+        self.clauses: dict[str, dict] = {}
+
+    def consume_pages(self, pages: list[dict]) -> None:
+        """Scan pages as returned by `ContentExtractor.get_processed_content()`."""
+        for page in pages:
+            text = page.get("content") or ""
+            for name in CLAUSE_FIELDS:
+                if name not in self.clauses:
+                    clause = self._extract(name, text)
+                    if clause is not None:
+                        clause.update(source="document", page_number=page.get("page_number"))
+                        self.clauses[name] = clause
+
+    def _extract(self, name: str, text: str) -> Optional[dict]:
+        for match in _EXTRACTION_PATTERNS[name].finditer(text):
+            sentence = _sentence_at(text, match.start())
+            if name in ("effective_date", "expiration_date"):
+                value = parse_date(match.group("date"))
+                if value is None:
+                    continue
+                return {"value": value, "text": sentence}
+            if name == "termination_notice":
+                if not re.search(r"terminat", sentence, re.IGNORECASE):
+                    continue
+                return {
+                    "value": f"{match.group('number')} {match.group('unit')}",
+                    "days": _period_in_days(match.group("number"), match.group("unit")),
+                    "text": sentence,
+                }
+            if name == "governing_law":
+                return {"value": " ".join(match.group("law").split()), "text": sentence}
+            if name == "renewal":
+                # skip mentions such as "renewal fees" without terms
+                if not re.search(r"term|period|year|month|automatic", sentence, re.IGNORECASE):
+                    continue
+                automatic = bool(re.search(r"automatic", sentence, re.IGNORECASE))
+                negated = bool(re.search(r"\b(?:not|no)\b[^.]{0,30}renew", sentence, re.IGNORECASE))
+                return {"value": sentence, "automatic": automatic and not negated, "text": sentence}
+        return None
+
+    def get_record(self) -> dict:
+        """The agreement's index record: metadata.yml fields merged with the extracted clauses.
+
+        Dates in metadata.yml are authoritative; a differing date found in the
+        document is logged and kept as `document_value`.
+        """
+        clauses = dict(self.clauses)
+        for name, key in _METADATA_FIELDS.items():
+            value = _metadata_value(self.metadata.get(key))
+            if value is None:
+                continue
+            extracted = clauses.get(name)
+            clause = {"value": value, "source": "metadata"}
+            if extracted is not None and extracted["value"] == value:
+                clause.update(page_number=extracted.get("page_number"), text=extracted.get("text"))
+            elif extracted is not None:
+                logger.warning(
+                    "%s: %s in metadata.yml is %s but page %s says %s",
+                    self.document_path.name, name, value, extracted.get("page_number"), extracted["value"],
+                )
+                clause["document_value"] = extracted["value"]
+            clauses[name] = clause
+        record = {k: _metadata_value(self.metadata.get(k)) for k in _DOCUMENT_KEYS}
+        record["file_name"] = record["file_name"] or self.document_path.name
+        record["clauses"] = clauses
+        return record
+
+
+class ClauseStore:
+    """JSON file of clause records, keyed by document file name."""
+
+    VERSION = 1
+
+    def __init__(self, path: Path, documents: Optional[dict[str, dict]] = None):
+        self.path = Path(path)
+        self.documents: dict[str, dict] = documents or {}
+
+    @classmethod
+    def load(cls, path: Path) -> "ClauseStore":
+        """Load the store, or return an empty one if the file does not exist."""
+        path = Path(path)
+        if not path.exists():
+            return cls(path)
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("version") != cls.VERSION:
+            logger.warning("Ignoring clause index %s with version %s", path, data.get("version"))
+            return cls(path)
+        return cls(path, data.get("documents", {}))
+
+    def put(self, record: dict) -> None:
+        self.documents[record["file_name"]] = record
+
+    def save(self) -> None:
+        """Write the store atomically so readers never see a partial file."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"version": self.VERSION, "documents": self.documents}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def resolve_document(self, query: str) -> Optional[dict]:
+        """Return the single agreement the query refers to, or None if it is ambiguous.
+
+        An agreement is referenced by its provider, name, id or file name. A
+        store holding a single agreement also resolves queries that name no
+        agreement at all ("When does the agreement expire?"), but not queries
+        that may name another one ("the AWS contract", "When does AWS expire?").
+        """
+        words = set(_TOKEN_RE.findall(query.lower()))
+        matches = [r for r in self.documents.values() if any(t <= words for t in _name_tokens(r))]
+        if len(matches) == 1:
+            return matches[0]
+        if not matches and len(self.documents) == 1:
+            record = next(iter(self.documents.values()))
+            known = set().union(*_name_tokens(record))
+            if _agreement_reference(query) <= known:
+                return record
+        return None
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+
+def _name_tokens(record: dict) -> list[set[str]]:
+    """Word sets of the provider, name, id and file name of a record."""
+    names = [record.get(k) for k in ("provider", "name", "id")]
+    names.append(Path(record["file_name"]).stem.replace("_", " "))
+    # every word of one of them must appear in a query to reference the record
+    return [tokens for tokens in (set(_TOKEN_RE.findall(n.lower())) for n in filter(None, names)) if tokens]
+
+
+def _agreement_reference(query: str) -> set[str]:
+    """Words that may name an agreement in the query, e.g. {"aws"} for "the AWS contract".
+
+    Besides words next to "agreement"/"contract", every capitalised word after
+    the first counts, unless it is contract vocabulary ("Effective Date").
+    """
+    words: set[str] = set()
+    for pattern in _AGREEMENT_REF_RES:
+        for match in pattern.finditer(query):
+            words.update(_TOKEN_RE.findall(match.group(1).lower()))
+    for match in _CAPITALISED_RE.finditer(query):
+        words.update(_TOKEN_RE.findall(match.group().lower()))
+    return words - _GENERIC_WORDS - _CLAUSE_WORDS
+
+
+@dataclass
+class ClauseAnswer:
+    """A lookup question answered from the clause index."""
+
+    document: str
+    field: str
+    answer: str
+    clause: dict
+
+
+def route_query(query: str) -> Optional[str]:
+    """Return the clause field a lookup question asks for, or None to use RAG.
+
+    Only single-value questions starting with what/when/which/how long are
+    routed; yes/no, conditional and compound questions go to RAG.
+    """
+    if not _LOOKUP_RE.search(query) or _NEEDS_RAG_RE.search(query):
+        return None
+    fields = [name for name, pattern in _INTENT_PATTERNS.items() if pattern.search(query)]
+    return fields[0] if len(fields) == 1 else None
+
+
+def _format_answer(record: dict, name: str, clause: dict) -> str:
+    agreement = record.get("name") or record["file_name"]
+    if name == "effective_date":
+        answer = f"{agreement} is effective from {clause['value']}."
+    elif name == "expiration_date":
+        answer = f"{agreement} expires on {clause['value']}."
+    elif name == "termination_notice":
+        answer = f"{agreement} requires {clause['value']} notice for termination."
+    elif name == "governing_law":
+        law = clause["value"]
+        if law.split()[0].lower() in ("state", "commonwealth", "province"):
+            law = f"the {law}"
+        answer = f"{agreement} is governed by the laws of {law}."
+    else:
+        answer = f"{agreement} renewal terms: {clause['value']}"
+    if clause.get("page_number") is not None:
+        answer += f" (Source: {record['file_name']}, page {clause['page_number']}"
+        if clause.get("text") and clause["text"] != clause["value"]:
+            answer += f': "{clause["text"]}"'
+        answer += ")"
+    else:
+        answer += f" (Source: {record['file_name']} metadata)"
+    return answer
+
+
+def answer_from_store(query: str, store: ClauseStore, document: Optional[str] = None) -> Optional[ClauseAnswer]:
+    """Answer a lookup question from `store`, or return None to fall back to RAG.
+
+    Args:
+        query (str): The user question.
+        store (ClauseStore): The clause index.
+        document (str, optional): File name of the agreement the question is
+            about; resolved from the question when omitted.
+    """
+    name = route_query(query)
+    if name is None:
+        return None
+    record = store.documents.get(document) if document else store.resolve_document(query)
+    if record is None:
+        return None
+    clause = record["clauses"].get(name)
+    if clause is None:
+        return None
+    return ClauseAnswer(record["file_name"], name, _format_answer(record, name, clause), clause)
+
+
+_store_lock = threading.Lock()
+_store_cache: dict[Path, tuple[float, ClauseStore]] = {}
+
+
+def load_store(path: Path = CLAUSE_INDEX_CONFIG["path"]) -> ClauseStore:
+    """Load the clause index, reusing the parsed file until it changes on disk."""
+    path = Path(path)
+    mtime = path.stat().st_mtime if path.exists() else 0.0
+    with _store_lock:
+        cached = _store_cache.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = _store_cache[path] = (mtime, ClauseStore.load(path))
+        return cached[1]
+
+
+def answer_from_clauses(query: str, document: Optional[str] = None) -> Optional[ClauseAnswer]:
+    """Answer a lookup question from the configured clause index (see CLAUSE_INDEX_CONFIG)."""
+    if not CLAUSE_INDEX_CONFIG["enabled"]:
+        return None
+    return answer_from_store(query, load_store(CLAUSE_INDEX_CONFIG["path"]), document)
@@ -0,0 +1,226 @@
+"""Session-scoped cache of retrieved pages for follow-up questions.
+
+A review session usually asks several questions about the same agreement.
+`SessionContextCache` keeps the pages returned by earlier searches (keyed by
+the object id from `SearchResult.id`), prefetches the neighbouring pages of
+every hit in the background, and answers follow-up retrievals from the cache
+when enough cached pages match the query — skipping the vector search, or
+shrinking its `limit` to the number of pages still missing.
+
+Every cached page remembers the filters it was retrieved under (neighbours
+are prefetched under the same filters), and only pages retrieved under the
+same filters are reused, so a cached page never bypasses e.g. the metadata
+filter of a later question.
+"""
+
+import logging
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from src.core.config import CONTEXT_CACHE_CONFIG
+from src.core.retriver.util import search_lib
+from src.core.spi.vector_db_spi import FilterSpec, SearchResult, VectorDBSPI
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is",
+    "it", "of", "on", "or", "the", "this", "to", "what", "when", "which", "who",
+    "with", "does", "do", "how", "our", "we", "there", "any",
+}
+
+
+def _terms(text: str) -> set[str]:
+    return {t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS}
+
+
+def _filter_key(filters: FilterSpec | None) -> Optional[str]:
+    """Comparable form of `filters`; pages are reused only under an equal key."""
+    # Weaviate filters are plain value objects with a deterministic repr
+    return None if filters is None else repr(filters)
+
+
+@dataclass
+class CacheStats:
+    """Counters describing how often the cache saved a search round-trip."""
+
+    lookups: int = 0
+    searches_skipped: int = 0
+    searches_shrunk: int = 0
+    pages_reused: int = 0
+    pages_prefetched: int = 0
+
+
+class SessionContextCache:
+    """Page cache shared by the questions of one review session.
+
+    The cache owns its vector DB adapter so background prefetches can run
+    between questions; use it as a context manager (or call `open()` /
+    `close()`) to manage the connection.
+    """
+
+    def __init__(
+        self,
+        adapter: VectorDBSPI,
+        collection: str,
+        *,
+        neighbour_window: int = CONTEXT_CACHE_CONFIG["neighbour_window"],
+        max_pages: int = CONTEXT_CACHE_CONFIG["max_pages"],
+        min_term_coverage: float = CONTEXT_CACHE_CONFIG["min_term_coverage"],
+        prefetch_workers: int = CONTEXT_CACHE_CONFIG["prefetch_workers"],
+    ) -> None:
+        self.adapter = adapter
+        self.collection = collection
+        self.neighbour_window = neighbour_window
+        self.max_pages = max_pages
+        self.min_term_coverage = min_term_coverage
+        self.stats = CacheStats()
+        self._pages: "OrderedDict[str, SearchResult]" = OrderedDict()
+        self._page_terms: dict[str, set[str]] = {}
+        self._page_filters: dict[str, set[Optional[str]]] = {}  # filter keys each page was retrieved under
+        self._prefetched: set[tuple[Any, Any, Optional[str]]] = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=prefetch_workers, thread_name_prefix="context-prefetch"
+        )
+
+    # ---- Lifecycle ----
+    def open(self) -> "SessionContextCache":
+        self.adapter.connect()
+        return self
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self.adapter.close()
+
+    def __enter__(self) -> "SessionContextCache":
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb) -> None:  # noqa: ANN001
+        self.close()
+
+    # ---- Cache ----
+    def put(
+        self,
+        results: list[SearchResult],
+        prefetch: bool = True,
+        filters: FilterSpec | None = None,
+    ) -> None:
+        """Add pages retrieved under `filters` to the cache and schedule neighbour prefetch."""
+        filter_key = _filter_key(filters)
+        with self._lock:
+            for result in results:
+                if result.id is None:
+                    continue
+                key = str(result.id)
+                self._pages[key] = result
+                self._pages.move_to_end(key)
+                self._page_terms[key] = _terms(result.properties.get("content") or "")
+                self._page_filters.setdefault(key, set()).add(filter_key)
+            while len(self._pages) > self.max_pages:
+                evicted, _ = self._pages.popitem(last=False)
+                self._page_terms.pop(evicted, None)
+                self._page_filters.pop(evicted, None)
+        if prefetch and self.neighbour_window > 0:
+            for result in results:
+                self._schedule_prefetch(result, filters)
+
+    def lookup(self, query: str, limit: int, filters: FilterSpec | None = None) -> list[SearchResult]:
+        """Return up to `limit` cached pages covering enough of the query terms.
+
+        Only pages retrieved under the same `filters` are considered; without
+        filters, any cached page matches.
+        """
+        wanted = _terms(query)
+        if not wanted:
+            return []
+        filter_key = _filter_key(filters)
+        scored = []
+        with self._lock:
+            for key, page in self._pages.items():
+                if filter_key is not None and filter_key not in self._page_filters[key]:
+                    continue
+                coverage = len(wanted & self._page_terms[key]) / len(wanted)
+                if coverage >= self.min_term_coverage:
+                    scored.append((coverage, key, page))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [page for _, _, page in scored[:limit]]
+
+    def retrieve(
+        self,
+        query: str,
+        type: str,
+        limit: int,
+        filters: FilterSpec | None = None,
+    ) -> list[SearchResult]:
+        """Retrieve `limit` pages, reusing cached pages before searching.
+
+        `search_lib` must be initialized with this cache's adapter.
+        """
+        self.stats.lookups += 1
+        cached = self.lookup(query, limit, filters)
+        self.stats.pages_reused += len(cached)
+        if len(cached) >= limit:
+            self.stats.searches_skipped += 1
+            logger.info("Context cache served %d pages, search skipped", len(cached))
+            return cached
+
+        if cached:
+            self.stats.searches_shrunk += 1
+        fresh = search_lib.weaviate_search_results(
+            query=query,
+            type=type,
+            collection=self.collection,
+            limit=limit - len(cached),
+            filters=filters,
+        )
+        self.put(fresh, filters=filters)
+        seen = {str(r.id) for r in cached}
+        return cached + [r for r in fresh if str(r.id) not in seen]
+
+    # ---- Prefetch ----
+    def _schedule_prefetch(self, result: SearchResult, filters: FilterSpec | None) -> None:
+        document = result.properties.get("document")
+        page_number = result.properties.get("page_number")
+        if document is None or page_number is None:
+            return
+        prefetch_key = (document, page_number, _filter_key(filters))
+        with self._lock:
+            if prefetch_key in self._prefetched:
+                return
+            self._prefetched.add(prefetch_key)
+        self._executor.submit(self._prefetch_neighbours, document, int(page_number), filters)
+
+    def _prefetch_neighbours(self, document: str, page_number: int, filters: FilterSpec | None) -> None:
+        first = max(1, page_number - self.neighbour_window)
+        last = page_number + self.neighbour_window
+        page_filter = search_lib.page_range_filter(document, first, last)
+        try:
+            neighbours = self.adapter.fetch_objects(
+                self.collection,
+                limit=last - first + 1,
+                # neighbours must pass the same filters as the hit to be reused for it
+                filters=page_filter if filters is None else page_filter & filters,
+            )
+        except Exception as e:  # prefetch is best-effort
+            logger.warning("Prefetch of %s pages %d-%d failed: %s", document, first, last, e)
+            return
+        self.put(neighbours, prefetch=False, filters=filters)
+        with self._lock:
+            self.stats.pages_prefetched += len(neighbours)
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+
+def open_session(collection: str, adapter: Optional[VectorDBSPI] = None) -> SessionContextCache:
+    """Create and connect a session cache (defaults to a local Weaviate adapter)."""
+    if adapter is None:
+        from src.sp_adapters.weaviate_adapter import WeaviateVectorDBAdapter
+        adapter = WeaviateVectorDBAdapter()
+    return SessionContextCache(adapter, collection).open()
@@ -0,0 +1,259 @@
+"""Duplicate page detection for the indexing pipeline.
+
+Agreements from the same provider repeat the same boilerplate (definitions,
+standard terms) page after page. `PageDeduplicator` sits between
+`ContentExtractor` and `index_lib.store_data_in_vector_db` and stores a page
+once when another document has exactly the same text (after whitespace
+normalisation) and the same effective date. The kept object lists every
+document and page it occurs in (`documents`, `occurrences`), so document
+filters still match it.
+
+Near-duplicates are not merged: contract pages that differ only in a notice
+period, a fee or a party name look alike to MinHash, and merging them would
+answer one agreement with another's terms. With
+`DEDUP_CONFIG["report_near_duplicates"]` set, MinHash signatures over word
+shingles with locality-sensitive hashing (banded signatures) count them in
+the report; this is off by default since it costs more than the rest of
+deduplication and changes nothing that is stored.
+
+`collapse_duplicates` applies the same exact test to search results, so a
+prompt never carries two copies of the same passage.
+"""
+
+import hashlib
+import logging
+import random
+import re
+import zlib
+from dataclasses import dataclass, field, replace
+from typing import Iterable, Optional
+
+from src.core.config import DEDUP_CONFIG
+from src.core.spi.vector_db_spi import SearchResult
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+")
+_SPACE_RE = re.compile(r"\s+")
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def occurrence(document: str, page_number: int) -> str:
+    """Reference to one page of one document, as stored in `occurrences`."""
+    return f"{document}#{page_number}"
+
+
+def content_key(content: str) -> bytes:
+    """Digest of `content` with whitespace normalised; equal for duplicate pages."""
+    normalized = _SPACE_RE.sub(" ", content).strip()
+    return hashlib.blake2b(normalized.encode(), digest_size=16).digest()
+
+
+class MinHasher:
+    """MinHash signatures over word shingles.
+
+    The permutations are derived from a fixed seed, so signatures are
+    comparable across processes and indexing runs.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = DEDUP_CONFIG["num_perm"],
+        shingle_size: int = DEDUP_CONFIG["shingle_size"],
+        seed: int = 1,
+    ):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self._perms = [
+            (rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)
+        ]
+
+    def shingles(self, text: str) -> set[int]:
+        words = _WORD_RE.findall(text.lower())
+        k = self.shingle_size
+        if len(words) < k:
+            return {zlib.crc32(" ".join(words).encode())} if words else set()
+        return {zlib.crc32(" ".join(words[i:i + k]).encode()) for i in range(len(words) - k + 1)}
+
+    def signature(self, text: str) -> Optional[tuple[int, ...]]:
+        """MinHash signature of `text`, or None if it has no words."""
+        shingles = self.shingles(text)
+        if not shingles:
+            return None
+        return tuple(
+            min(((a * s + b) % _PRIME) & _MAX_HASH for s in shingles) for a, b in self._perms
+        )
+
+
+def similarity(a: tuple[int, ...], b: tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+class LSHIndex:
+    """Banded LSH over MinHash signatures.
+
+    With `bands` bands of `rows` rows, two pages with Jaccard similarity s
+    become candidates with probability 1 - (1 - s^rows)^bands; candidates are
+    confirmed against `threshold` with the full signature.
+    """
+
+    def __init__(
+        self,
+        bands: int = DEDUP_CONFIG["bands"],
+        rows: int = DEDUP_CONFIG["rows"],
+        threshold: float = DEDUP_CONFIG["threshold"],
+    ):
+        self.bands = bands
+        self.rows = rows
+        self.threshold = threshold
+        self._buckets: list[dict[tuple[int, ...], list[int]]] = [{} for _ in range(bands)]
+        self._signatures: list[tuple[int, ...]] = []
+
+    def query(self, signature: tuple[int, ...]) -> Optional[int]:
+        """Return the key of the most similar indexed signature above the threshold."""
+        candidates: set[int] = set()
+        for band, buckets in enumerate(self._buckets):
+            candidates.update(buckets.get(self._band(signature, band), ()))
+        best, best_score = None, self.threshold
+        for key in sorted(candidates):
+            score = similarity(signature, self._signatures[key])
+            if score >= best_score:
+                best, best_score = key, score
+        return best
+
+    def add(self, signature: tuple[int, ...]) -> int:
+        key = len(self._signatures)
+        self._signatures.append(signature)
+        for band, buckets in enumerate(self._buckets):
+            buckets.setdefault(self._band(signature, band), []).append(key)
+        return key
+
+    def _band(self, signature: tuple[int, ...], band: int) -> tuple[int, ...]:
+        return signature[band * self.rows:(band + 1) * self.rows]
+
+
+@dataclass
+class DedupReport:
+    """What deduplication saved for one indexing run."""
+
+    pages: int = 0
+    stored: int = 0
+    duplicates: int = 0
+    # similar to a stored page but with different text or date, stored separately
+    # (None unless DEDUP_CONFIG["report_near_duplicates"])
+    near_duplicates: Optional[int] = None
+    content_chars: int = 0
+    stored_chars: int = 0
+    # pages of each document merged into an earlier occurrence
+    duplicates_by_document: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def embedding_calls_saved(self) -> int:
+        # the vectorizer embeds each stored object once
+        return self.duplicates
+
+    def summary(self) -> str:
+        saved = 1 - self.stored_chars / self.content_chars if self.content_chars else 0.0
+        near = f" ({self.near_duplicates} near-duplicates kept)" if self.near_duplicates is not None else ""
+        return (
+            f"Deduplication: {self.pages} pages stored as {self.stored} objects, "
+            f"{self.duplicates} duplicates merged{near}, "
+            f"{self.embedding_calls_saved} embedding calls saved, "
+            f"content {self.content_chars} -> {self.stored_chars} chars ({saved:.0%} smaller)"
+        )
+
+
+class PageDeduplicator:
+    """Merges duplicate pages of all documents of an indexing run.
+
+    The first occurrence of a text is kept and gains the `documents` and
+    `occurrences` of every later page with the same text and effective date.
+    Pages are only merged on identical text, since the kept object's
+    `content` and `effective_date` are what every listed document is answered
+    and filtered with. Near-duplicates are counted when `report_near_duplicates`
+    is true (default: `DEDUP_CONFIG["report_near_duplicates"]`).
+    """
+
+    def __init__(
+        self,
+        hasher: Optional[MinHasher] = None,
+        index: Optional[LSHIndex] = None,
+        report_near_duplicates: Optional[bool] = None,
+    ):
+        if report_near_duplicates is None:
+            report_near_duplicates = DEDUP_CONFIG["report_near_duplicates"]
+        self.hasher = (hasher or MinHasher()) if report_near_duplicates else None
+        self.index = (index or LSHIndex()) if report_near_duplicates else None
+        self.report = DedupReport(near_duplicates=0 if report_near_duplicates else None)
+        self._objects: list[dict] = []
+        self._by_key: dict[tuple[bytes, Optional[str]], int] = {}  # (content, date) -> position in _objects
+
+    def add(self, pages: Iterable[dict]) -> None:
+        """Add the pages returned by `ContentExtractor.get_processed_content()`."""
+        for page in pages:
+            self._add(page)
+
+    def _add(self, page: dict) -> None:
+        content = page.get("content") or ""
+        self.report.pages += 1
+        self.report.content_chars += len(content)
+        ref = occurrence(page["document"], page["page_number"])
+        key = (content_key(content), page.get("effective_date"))
+        if key in self._by_key:
+            kept = self._objects[self._by_key[key]]
+            if page["document"] not in kept["documents"]:
+                kept["documents"].append(page["document"])
+            kept["occurrences"].append(ref)
+            self.report.duplicates += 1
+            self.report.duplicates_by_document[page["document"]] = (
+                self.report.duplicates_by_document.get(page["document"], 0) + 1
+            )
+            return
+        signature = self.hasher.signature(content) if self.hasher else None
+        if signature is not None:
+            if self.index.query(signature) is not None:
+                self.report.near_duplicates += 1
+            self.index.add(signature)
+        self._by_key[key] = len(self._objects)
+        self._objects.append(dict(page, documents=[page["document"]], occurrences=[ref]))
+        self.report.stored += 1
+        self.report.stored_chars += len(content)
+
+    def get_objects(self) -> list[dict]:
+        return self._objects
+
+
+def collapse_duplicates(results: list[SearchResult]) -> list[SearchResult]:
+    """Drop results whose content duplicates a higher-ranked result.
+
+    Only identical passages (see `content_key`) are collapsed; the kept result
+    is replaced by a copy that inherits the `occurrences` of the dropped ones,
+    so the input results (which may be cached) are not modified.
+    """
+    kept: dict[bytes, SearchResult] = {}
+    merged: set[bytes] = set()
+    for result in results:
+        props = result.properties or {}
+        key = content_key(props.get("content") or "")
+        duplicate_of = kept.get(key)
+        if duplicate_of is None:
+            kept[key] = result
+            continue
+        if key not in merged:
+            kept_props = dict(duplicate_of.properties or {})
+            kept_props["occurrences"] = list(
+                kept_props.get("occurrences")
+                or [occurrence(kept_props.get("document"), kept_props.get("page_number"))]
+            )
+            duplicate_of = kept[key] = replace(duplicate_of, properties=kept_props)
+            merged.add(key)
+        refs = duplicate_of.properties["occurrences"]
+        for ref in props.get("occurrences") or [occurrence(props.get("document"), props.get("page_number"))]:
+            if ref not in refs:
+                refs.append(ref)
+    if len(kept) < len(results):
+        logger.info("Collapsed %d duplicate search results", len(results) - len(kept))
+    return list(kept.values())
@@ -0,0 +1,396 @@
+"""Tiered PDF text extraction.
+
+Born-digital contracts have a clean text layer, so running unstructured's
+hi_res layout model on every page is wasted work. `extract_pdf_elements`
+first reads each page's text with pypdf and only sends pages that need
+layout analysis (scanned, little text, table-heavy) through
+`index_lib.partition_pdf`. The result is a flat element list in page order
+with a `PageBreak` element after every page, to be consumed by
+`ContentExtractor(..., use_page_breaks=True)`.
+
+Layout pages of large documents are split into page ranges that are
+partitioned concurrently in worker processes (`partition_page_ranges`), so a
+single long contract no longer runs on one core. A range whose worker runs
+over its resident memory cap is split in half and retried in fresh workers.
+"""
+
+import logging
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+from src.core.config import PDF_EXTRACTION_CONFIG
+from src.core.retriver.util import index_lib
+
+logger = logging.getLogger(__name__)
+
+FAST_TIER = "text_layer"
+LAYOUT_TIER = "hi_res"
+
+# "Page 3" / "Page 3 of 12" footers; page boundaries come from PageBreak elements instead.
+_FOOTER_RE = re.compile(r"^\s*page\s+\d+(\s+of\s+\d+)?\s*$", re.IGNORECASE)
+_CELL_SPLIT_RE = re.compile(r"\t|\s{2,}")
+_NUMBER_RE = re.compile(r"^[\$€£]?[\d.,%]+$")
+
+
+@dataclass
+class TextElement:
+    """Minimal element compatible with ContentExtractor (category + text)."""
+
+    category: str
+    text: str
+    page_number: int
+
+
+@dataclass
+class ExtractionReport:
+    """How the pages of one document were extracted."""
+
+    document: str
+    pages: int = 0
+    fast_pages: int = 0
+    layout_pages: int = 0
+    layout_reasons: dict[str, int] = field(default_factory=dict)
+    fast_seconds: float = 0.0
+    layout_seconds: float = 0.0
+
+    def estimated_seconds_saved(
+        self, hi_res_seconds_per_page: float = PDF_EXTRACTION_CONFIG["hi_res_seconds_per_page"]
+    ) -> float:
+        """Estimated hi_res time avoided by the pages that used the text layer."""
+        if self.layout_pages:
+            hi_res_seconds_per_page = self.layout_seconds / self.layout_pages
+        return self.fast_pages * hi_res_seconds_per_page - self.fast_seconds
+
+    def summary(self) -> str:
+        reasons = ", ".join(f"{k}={v}" for k, v in sorted(self.layout_reasons.items())) or "-"
+        return (
+            f"{self.document}: {self.pages} pages, {self.fast_pages} via {FAST_TIER} "
+            f"({self.fast_seconds:.1f}s), {self.layout_pages} via {LAYOUT_TIER} "
+            f"({self.layout_seconds:.1f}s; {reasons}), ~{self.estimated_seconds_saved():.1f}s saved"
+        )
+
+
+def _has_images(page: Any) -> bool:
+    """Check the page resources for image XObjects without decoding them."""
+    resources = page.get("/Resources")
+    if resources is None:
+        return False
+    xobjects = resources.get_object().get("/XObject")
+    if xobjects is None:
+        return False
+    xobjects = xobjects.get_object()
+    return any(xobjects[name].get_object().get("/Subtype") == "/Image" for name in xobjects)
+
+
+def _is_tabular(line: str) -> bool:
+    cells = [c for c in _CELL_SPLIT_RE.split(line.strip()) if c]
+    if len(cells) >= 3:
+        return True
+    numbers = sum(1 for token in line.split() if _NUMBER_RE.match(token))
+    return numbers >= 3
+
+
+def layout_reason(page: Any, text: str, config: dict = PDF_EXTRACTION_CONFIG) -> Optional[str]:
+    """Return why a page needs hi_res layout analysis, or None if its text layer is usable."""
+    chars = len(text.strip())
+    if chars < config["min_text_chars"]:
+        return "low_text"
+    if chars < config["scanned_max_chars"] and _has_images(page):
+        return "scanned"
+    lines = [line for line in text.splitlines() if line.strip()]
+    if lines and sum(map(_is_tabular, lines)) / len(lines) >= config["table_line_ratio"]:
+        return "table_heavy"
+    return None
+
+
+def _text_layer_elements(text: str, page_number: int) -> list[TextElement]:
+    return [
+        TextElement("NarrativeText", line.strip(), page_number)
+        for line in text.splitlines()
+        if line.strip() and not _FOOTER_RE.match(line)
+    ]
+
+
+def _page_runs(page_numbers: list[int]) -> list[tuple[int, int]]:
+    """Group sorted page numbers into contiguous (first, last) runs."""
+    runs: list[tuple[int, int]] = []
+    for number in page_numbers:
+        if runs and runs[-1][1] == number - 1:
+            runs[-1] = (runs[-1][0], number)
+        else:
+            runs.append((number, number))
+    return runs
+
+
+def partition_pages(reader: Any, first: int, last: int, **partition_kwargs: Any) -> list:
+    """Run hi_res partitioning on pages [first, last] (1-based) of an open PdfReader.
+
+    The pages are copied into a temporary PDF; `starting_page_number` keeps the
+    element page numbers aligned with the original document.
+    """
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for index in range(first - 1, last):
+        writer.add_page(reader.pages[index])
+    fd, tmp_path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            writer.write(f)
+        return index_lib.partition_pdf(
+            filename=tmp_path,
+            strategy="hi_res",
+            infer_table_structure=True,
+            include_page_breaks=False,
+            unique_element_ids=True,
+            starting_page_number=first,
+            **partition_kwargs,
+        )
+    finally:
+        os.remove(tmp_path)
+
+
+def _split_ranges(page_numbers: list[int], range_size: int) -> list[tuple[int, int]]:
+    """Contiguous runs of `page_numbers`, each cut into at most `range_size` pages."""
+    ranges = []
+    for first, last in _page_runs(page_numbers):
+        for start in range(first, last + 1, range_size):
+            ranges.append((start, min(start + range_size - 1, last)))
+    return ranges
+
+
+class _MemoryWatchdog:
+    """Interrupts the main thread while armed if the process RSS exceeds `memory_mb`.
+
+    An address-space limit (RLIMIT_AS) does not work for partition workers:
+    torch and onnxruntime reserve several GB of virtual memory on import. The
+    watchdog polls the RSS instead and is only armed while a range is being
+    partitioned, so it never fires outside the task.
+    """
+
+    def __init__(self, memory_mb: int, interval: float = 0.5) -> None:
+        import psutil
+
+        self.memory_mb = memory_mb
+        self.exceeded = False
+        self._process = psutil.Process()
+        self._interval = interval
+        self._armed = True
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._watch, name="memory-watchdog", daemon=True)
+        self._thread.start()
+
+    def _watch(self) -> None:
+        import _thread
+
+        limit = self.memory_mb * 2**20
+        while not self._stopped.wait(self._interval):
+            if self._process.memory_info().rss > limit:
+                with self._lock:
+                    if self._armed and not self.exceeded:
+                        self.exceeded = True
+                        _thread.interrupt_main()  # raises KeyboardInterrupt in the task
+
+    def disarm(self) -> None:
+        # no interrupt is sent once this returns
+        with self._lock:
+            self._armed = False
+        self._stopped.set()
+
+
+def _partition_range_worker(path: str, first: int, last: int, memory_mb: int) -> list:
+    from pypdf import PdfReader
+
+    watchdog = None
+    if memory_mb > 0:
+        try:
+            watchdog = _MemoryWatchdog(memory_mb)
+        except ImportError:
+            logger.warning("psutil is not installed, worker memory is not capped")
+    try:
+        try:
+            return partition_pages(PdfReader(path), first, last)
+        finally:
+            if watchdog is not None:
+                watchdog.disarm()
+    except KeyboardInterrupt:
+        if watchdog is not None and watchdog.exceeded:
+            raise MemoryError(f"pages {first}-{last} exceeded {memory_mb} MB resident memory") from None
+        raise
+
+
+def _pool_size(ranges: int, config: dict) -> int:
+    workers = min(config["max_workers"], ranges)
+    if config["worker_memory_mb"] > 0:
+        try:
+            import psutil
+        except ImportError:
+            return workers
+        # never start more workers than the machine can hold at their cap
+        available_mb = psutil.virtual_memory().available // 2**20
+        workers = min(workers, max(1, available_mb // config["worker_memory_mb"]))
+    return max(1, workers)
+
+
+def partition_page_ranges(
+    path: Path,
+    page_numbers: Optional[list[int]] = None,
+    config: dict = PDF_EXTRACTION_CONFIG,
+) -> list:
+    """Partition pages with hi_res, splitting them into concurrently processed ranges.
+
+    Args:
+        path (Path): The PDF file.
+        page_numbers (list[int], optional): 1-based pages to partition; all
+            pages when omitted.
+        config (dict): `page_range_size`, `max_workers` and `worker_memory_mb`
+            (resident memory cap per worker), see config.PDF_EXTRACTION_CONFIG.
+
+    Returns:
+        list: The elements of all ranges in page order, with page numbers
+        relative to the original document.
+    """
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    if page_numbers is None:
+        page_numbers = list(range(1, len(reader.pages) + 1))
+    ranges = _split_ranges(page_numbers, max(1, config["page_range_size"]))
+    workers = _pool_size(len(ranges), config)
+    # with a memory cap, even a single worker runs in its own (capped) process
+    if workers == 1 and config["worker_memory_mb"] <= 0:
+        return [e for first, last in ranges for e in partition_pages(reader, first, last)]
+
+    results: dict[tuple[int, int], list] = {}
+    pending = ranges
+    while pending:
+        failed = _run_page_ranges(path, pending, _pool_size(len(pending), config), config, results)
+        pending = []
+        for first, last in failed:
+            if first == last:
+                raise MemoryError(
+                    f"page {first} of {Path(path).name} ran out of memory in its worker "
+                    f"(cap {config['worker_memory_mb']} MB, 0 = none); raise PDF_PARTITION_WORKER_MEMORY_MB "
+                    f"or free memory"
+                )
+            middle = (first + last) // 2
+            pending += [(first, middle), (middle + 1, last)]
+    # ranges do not overlap, so sorting them restores page order
+    return [e for page_range in sorted(results) for e in results[page_range]]
+
+
+def _run_page_ranges(
+    path: Path, ranges: list[tuple[int, int]], workers: int, config: dict, results: dict
+) -> list[tuple[int, int]]:
+    """Partition `ranges` in a process pool, adding the elements to `results`.
+
+    Returns the ranges whose worker ran out of memory (over the cap, or killed
+    by the OS, which breaks the pool) to be retried in smaller pieces.
+    """
+    logger.info("Partitioning %d page ranges of %s with %d workers", len(ranges), Path(path).name, workers)
+    memory_mb = config["worker_memory_mb"]
+    failed = []
+    # spawn: the layout models are not fork-safe once loaded. With a memory cap,
+    # every range gets a fresh worker so one over the cap never runs another range
+    # (the layout models are then loaded once per range).
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        max_tasks_per_child=1 if memory_mb > 0 else None,
+    ) as pool:
+        futures = {
+            pool.submit(_partition_range_worker, str(path), first, last, memory_mb): (first, last)
+            for first, last in ranges
+        }
+        for future in as_completed(futures):
+            first, last = futures[future]
+            try:
+                results[(first, last)] = future.result()
+            except (MemoryError, BrokenProcessPool) as e:
+                logger.warning("Pages %d-%d of %s failed (%s), retrying them split in half",
+                               first, last, Path(path).name, e)
+                failed.append((first, last))
+    return failed
+
+
+def _with_page_breaks(pages: dict[int, list], page_count: int) -> list:
+    elements: list = []
+    for number in range(1, page_count + 1):
+        elements.extend(pages.get(number, []))
+        elements.append(TextElement("PageBreak", "", number))
+    return elements
+
+
+def _group_layout_elements(elements: list, pages: dict[int, list], default_page: int = 1) -> None:
+    """Add hi_res elements to `pages` by their page number, dropping footers."""
+    for element in elements:
+        number = getattr(element.metadata, "page_number", None) or default_page
+        if element.category in ("NarrativeText", "UncategorizedText") and _FOOTER_RE.match(element.text):
+            continue
+        pages.setdefault(number, []).append(element)
+
+
+def partition_pdf_with_page_breaks(path: Path, config: dict = PDF_EXTRACTION_CONFIG) -> list:
+    """hi_res partition of every page (in parallel ranges), with a PageBreak after each page."""
+    from pypdf import PdfReader
+
+    page_count = len(PdfReader(path).pages)
+    pages: dict[int, list] = {}
+    _group_layout_elements(partition_page_ranges(path, None, config), pages)
+    return _with_page_breaks(pages, page_count)
+
+
+def extract_pdf_elements(
+    path: Path, config: dict = PDF_EXTRACTION_CONFIG
+) -> tuple[list, ExtractionReport]:
+    """Extract the elements of a PDF, using hi_res only for pages that need it.
+
+    Args:
+        path (Path): The PDF file.
+        config (dict): Thresholds, see config.PDF_EXTRACTION_CONFIG.
+
+    Returns:
+        tuple: The elements in page order (each page followed by a PageBreak)
+        and an ExtractionReport.
+    """
+    from pypdf import PdfReader
+
+    report = ExtractionReport(document=Path(path).name)
+    start = time.perf_counter()
+    reader = PdfReader(path)
+    report.pages = len(reader.pages)
+
+    pages: dict[int, list] = {}
+    layout_page_numbers: list[int] = []
+    for number, page in enumerate(reader.pages, 1):
+        text = page.extract_text() or ""
+        reason = layout_reason(page, text, config)
+        if reason is None:
+            pages[number] = _text_layer_elements(text, number)
+        else:
+            layout_page_numbers.append(number)
+            report.layout_reasons[reason] = report.layout_reasons.get(reason, 0) + 1
+    report.fast_pages = report.pages - len(layout_page_numbers)
+    report.layout_pages = len(layout_page_numbers)
+    # the text-layer pass also classified the layout pages; attribute it to the fast tier
+    report.fast_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if layout_page_numbers:
+        _group_layout_elements(
+            partition_page_ranges(path, layout_page_numbers, config), pages
+        )
+    report.layout_seconds = time.perf_counter() - start
+
+    logger.info(report.summary())
+    return _with_page_breaks(pages, report.pages), report
@@ -4,9 +4,8 @@ import logging
 from pathlib import Path
 from datetime import datetime
 from pathlib import Path
-from weaviate.embedded import EmbeddedOptions
-from unstructured.partition.pdf import partition_pdf
 from src.core.config import WEAVIATE_SCHEMA
+from src.core.retriver.util.dedup_lib import occurrence
 from typing import Any, Optional
 
 # Module-level variable. Use get_vector_db_adapter() to access safely.
@@ -17,9 +16,19 @@ logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 class ContentExtractor:
-    def __init__(self, document_path: Path, metadata: dict):
+    def __init__(self, document_path: Path, metadata: dict, use_page_breaks: bool = False):
+        """
+        Args:
+            document_path (Path): The source PDF.
+            metadata (dict): The document's entry from metadata.yml.
+            use_page_breaks (bool): End pages on `PageBreak` elements only
+                (as produced by extraction_lib) instead of on narrative text
+                containing "Page" (footer detection for plain partition_pdf output),
+                and keep the text of `Table` and `UncategorizedText` elements.
+        """
         self.document_path = document_path
         self.metadata = metadata
+        self.use_page_breaks = use_page_breaks
         self.page_end = False  # Keep track of whether we've reached the end of a page
         self.texts = ""  # Keep track of the extracted content text
         self.text_list = []
@@ -33,11 +42,20 @@ class ContentExtractor:
         Returns:
             bool: Whether the processing was successful.
         """
+        if element.category == "PageBreak" and self.use_page_breaks:
+            self.page_end = True
+            return True
+
         if element.category == "Title" or element.category == "ListItem":
             self.concate_text(element.text)
+
+        # hi_res pages from extraction_lib: table-heavy pages yield Table elements
+        # and scanned pages often UncategorizedText, which would otherwise be lost
+        if self.use_page_breaks and element.category in ("Table", "UncategorizedText"):
+            self.concate_text(element.text)
             
         if element.category == "NarrativeText":
-            if "Page" in element.text:
+            if "Page" in element.text and not self.use_page_breaks:
                 self.page_end = True
             else:
                 self.concate_text(element.text)
@@ -68,7 +86,10 @@ class ContentExtractor:
                     "page_number": page_no,  
                     "document": self.document_path.name,  
                     "content": self.content(),
-                    "effective_date": self.metadata.get("effective_date").strftime("%Y-%m-%dT%H:%M:%SZ")
+                    "effective_date": self.metadata.get("effective_date").strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    # extended by dedup_lib when other documents contain the same text
+                    "documents": [self.document_path.name],
+                    "occurrences": [occurrence(self.document_path.name, page_no)]
                 }
                 self.text_list.append(data_struct)
                 self.reset_content() # reset the self.texts variable to store content for the next page
@@ -84,6 +105,15 @@ class ContentExtractor:
     def get_processed_content(self) -> list[dict]:
         return self.text_list
 
+def partition_pdf(*args, **kwargs) -> list:
+    """Lazy wrapper around `unstructured.partition.pdf.partition_pdf`.
+
+    unstructured pulls in torch, transformers and onnxruntime, so it is only
+    imported when a PDF is actually partitioned.
+    """
+    from unstructured.partition.pdf import partition_pdf as _partition_pdf
+    return _partition_pdf(*args, **kwargs)
+
 def partition_pdf_file(file_path: str) -> any:
     """Partitions a PDF file into its constituent elements.
 
@@ -117,12 +147,17 @@ def clear_vector_db_adapter() -> None:
     global vector_db_adapter
     vector_db_adapter = None
     
-def create_schema(schema: dict) -> None:
+def create_schema(schema: dict, vector_index_config: Optional[dict] = None) -> None:
     """Create a Vector DB schema for the Document class.
+
+    Args:
+        schema (dict): The collection schema (see config.WEAVIATE_SCHEMA).
+        vector_index_config (dict, optional): HNSW/quantization settings
+            (see config.WEAVIATE_VECTOR_INDEX_CONFIG).
     """
     vector_db_adapter = _get_vector_db_adapter()
     vector_db_adapter.drop_all_collections()
-    vector_db_adapter.create_schema(schema)
+    vector_db_adapter.create_schema(schema, vector_index_config=vector_index_config)
     return None
 
 def store_data_in_vector_db(data_objects: list[dict], collection: str) -> None:
@@ -3,15 +3,15 @@ from typing import Any, Optional
 
 sys.path.append("/home/kosala/git-repos/contract_inspect/")
 
-from weaviate.classes.query import Filter
-from src.core.config import METADATA_CONFIG_PATH
+from src.core.config import DEDUP_CONFIG, METADATA_CONFIG_PATH
+from src.core.retriver.util.dedup_lib import collapse_duplicates, occurrence
 from src.core.spi.vector_db_spi import (
     VectorDBSPI,
     SearchResult,
     VectorDBError,
     FilterSpec,
 )
-from src.sp_adapters.weaviate_adapter import WeaviateVectorDBAdapter
+from src.core.spi.embedding_spi import EmbeddingSPI
 import yaml
 
 """Module to perform searches via a pluggable Vector DB adapter.
@@ -21,6 +21,9 @@ Mirrors the adapter wiring in index_lib.py and avoids direct client usage.
 
 # Module-level variable. Use _get_vector_db_adapter() to access safely.
 vector_db_adapter: Optional[VectorDBSPI] = None
+# Optional in-process query embedder; when set, vector and hybrid searches pass
+# the query vector instead of having the vector DB call its vectorizer.
+query_embedder: Optional[EmbeddingSPI] = None
 
 
 def init(adapter: Any) -> None:
@@ -44,19 +47,61 @@ def clear_vector_db_adapter() -> None:
     global vector_db_adapter
     vector_db_adapter = None
 
-def weaviate_search(
+def init_query_embedder(embedder: EmbeddingSPI) -> None:
+    """Embed vector/hybrid search queries in-process with `embedder`.
+
+    The embedder must produce vectors in the collection's embedding space
+    (see onnx_embedding_adapter.verify_parity).
+    """
+    global query_embedder
+    query_embedder = embedder
+
+def clear_query_embedder() -> None:
+    """Go back to letting the vector DB embed queries."""
+    global query_embedder
+    query_embedder = None
+
+def embed_queries(queries: list[str]) -> list[Optional[list[float]]]:
+    """Embed several queries in one batch (None for each if no embedder is set).
+
+    With a caching embedder this also warms the cache for the searches that follow.
+    """
+    if query_embedder is None:
+        return [None] * len(queries)
+    return query_embedder.embed(queries)
+
+def _query_vector(query: str) -> Optional[list[float]]:
+    if query_embedder is None:
+        return None
+    try:
+        return query_embedder.embed_query(query)
+    except Exception as e:
+        # the vector DB can still embed the query itself
+        print("Local query embedding failed, using the vectorizer:", e)
+        return None
+
+def weaviate_search_results(
     query: str,
     type: str,
     collection: str,
     limit: int,
     filters: FilterSpec | None = None,
-) -> list[str]:
-    """Search via the configured Vector DB adapter and return content strings.
-
-    The adapter must be initialized (and typically connected) via init(adapter).
-    Returns the `content` property from each hit if present.
+    collapse: bool = True,
+    raise_errors: bool = False,
+) -> list[SearchResult]:
+    """Search via the configured Vector DB adapter and return the raw hits.
+
+    Same as weaviate_search() but keeps object ids and all properties, which
+    callers need to cache or de-duplicate results. With `collapse`, more hits
+    are fetched and duplicate passages are dropped before trimming to
+    `limit` (see dedup_lib.collapse_duplicates). Search errors are printed
+    and return no hits, unless `raise_errors` is set (batch runs must not
+    record an outage as "not found").
     """
     adapter = _get_vector_db_adapter()
+    requested = limit
+    if collapse:
+        limit = limit * DEDUP_CONFIG["search_overfetch"]
     try:
         results: list[SearchResult]
         if type == "bm25":
@@ -72,22 +117,46 @@ def weaviate_search(
                 query, 
                 limit=limit, 
                 filters=filters, 
-                return_distance=True
+                return_distance=True,
+                query_vector=_query_vector(query)
             )
         elif type == "hybrid":
             results = adapter.search_hybrid(
                 collection, 
                 query, 
                 limit=limit, 
-                filters=filters
+                filters=filters,
+                query_vector=_query_vector(query)
             )
         else:
             raise ValueError("search type is not supported")
     except (VectorDBError, Exception) as e:
+        if raise_errors:
+            raise
         print("Error occurred while searching:", e)
         return []
+    if collapse:
+        results = collapse_duplicates(results)
+    return results[:requested]
 
-    # Extract the `content` field if present.
+def weaviate_search(
+    query: str,
+    type: str,
+    collection: str,
+    limit: int,
+    filters: FilterSpec | None = None,
+) -> list[str]:
+    """Search via the configured Vector DB adapter and return content strings.
+
+    The adapter must be initialized (and typically connected) via init(adapter).
+    Returns the `content` property from each hit if present.
+    """
+    return result_contents(
+        weaviate_search_results(query, type, collection, limit, filters)
+    )
+
+def result_contents(results: list[SearchResult]) -> list[str]:
+    """Extract the `content` field from each hit if present."""
     out: list[str] = []
     for r in results:
         props = r.properties or {}
@@ -97,6 +166,7 @@ def weaviate_search(
 
 def add_metadata_filters(filter_config: dict) -> FilterSpec:
     # create set of metadata filters using a configuration
+    from weaviate.classes.query import Filter  # imported lazily, see weaviate_adapter.py
     filters = (
         Filter.by_property(
             "effective_date").greater_or_equal(
@@ -104,7 +174,23 @@ def add_metadata_filters(filter_config: dict) -> FilterSpec:
     )
     return filters
 
+def document_filter(document: str) -> FilterSpec:
+    # restrict results to pages contained in a source document, including
+    # shared pages stored once under another document (see dedup_lib.py)
+    from weaviate.classes.query import Filter
+    return Filter.by_property("documents").contains_any([document])
+
+def page_range_filter(document: str, first_page: int, last_page: int) -> FilterSpec:
+    # pages of one document within [first_page, last_page], including shared
+    # pages stored once under another document (see dedup_lib.py)
+    from weaviate.classes.query import Filter
+    return Filter.by_property("occurrences").contains_any(
+        [occurrence(document, page) for page in range(first_page, last_page + 1)]
+    )
+
 if __name__ == "__main__":
+    from src.sp_adapters.weaviate_adapter import WeaviateVectorDBAdapter
+
     query = "oracle"
     type = "hybrid"  # or "vector" or "hybrid"
     collection = "Page"
@@ -0,0 +1,304 @@
+"""Export a collection to a Parquet snapshot and restore it without re-embedding.
+
+Rebuilding the index with index_invoker.py partitions and embeds every
+contract again. A snapshot instead stores each object's id, properties and
+vector in a zstd-compressed Parquet file (one column per property, vectors as
+fixed-size float32 lists) together with the collection definition and the
+clause index, written row group by row group while the collection is
+streamed. Restoring recreates only that collection and bulk-inserts the
+objects with their stored vectors, so the vectorizer is never called.
+"""
+
+import json
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from src.core.config import CLAUSE_INDEX_CONFIG, SNAPSHOT_CONFIG
+from src.core.spi.vector_db_spi import VectorDBError, VectorDBSPI
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+# keys of the Parquet key-value metadata
+_META_SCHEMA = b"contract_inspect.schema"
+_META_INFO = b"contract_inspect.snapshot"
+_META_CLAUSE_INDEX = b"contract_inspect.clause_index"
+# columns next to the property columns
+_ID_COLUMN = "_id"
+_VECTOR_COLUMN = "_vector"
+
+
+@dataclass
+class SnapshotReport:
+    collection: str
+    path: Path
+    objects: int = 0
+    dimensions: Optional[int] = None
+    file_bytes: int = 0
+    seconds: float = 0.0
+
+    def summary(self, action: str) -> str:
+        rate = self.objects / self.seconds if self.seconds else 0.0
+        return (
+            f"{action} {self.objects} objects of {self.collection} ({self.dimensions or '-'}-dim vectors) "
+            f"{'to' if action == 'Exported' else 'from'} {self.path} "
+            f"[{self.file_bytes / 2**20:.1f} MB] in {self.seconds:.1f}s ({rate:.0f} objects/s)"
+        )
+
+
+def _arrow_type(data_type: str) -> Any:
+    """Arrow type of a Weaviate property data type; unknown types are stored as JSON text."""
+    import pyarrow as pa
+
+    scalar = {
+        "text": pa.string(),
+        "uuid": pa.string(),
+        "int": pa.int64(),
+        "number": pa.float64(),
+        "boolean": pa.bool_(),
+        "date": pa.timestamp("us", tz="UTC"),
+    }
+    if data_type.endswith("[]") and data_type[:-2] in scalar:
+        return pa.list_(scalar[data_type[:-2]])
+    return scalar.get(data_type)
+
+
+def _property_types(schema: dict) -> dict[str, Any]:
+    import pyarrow as pa
+
+    types = {}
+    for prop in schema.get("properties", []):
+        data_type = prop.get("dataType", ["text"])[0]
+        types[prop["name"]] = _arrow_type(data_type) or pa.string()
+    return types
+
+
+def _json_columns(schema: dict) -> set[str]:
+    return {
+        p["name"] for p in schema.get("properties", []) if _arrow_type(p.get("dataType", ["text"])[0]) is None
+    }
+
+
+def _to_column_value(value: Any, json_column: bool) -> Any:
+    if value is None:
+        return None
+    if json_column:
+        return json.dumps(value, default=str)
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def export_collection(
+    adapter: VectorDBSPI,
+    collection: str,
+    path: Path,
+    *,
+    row_group_size: int = SNAPSHOT_CONFIG["row_group_size"],
+    compression: str = SNAPSHOT_CONFIG["compression"],
+    compression_level: Optional[int] = SNAPSHOT_CONFIG["compression_level"],
+    clause_index_path: Optional[Path] = CLAUSE_INDEX_CONFIG["path"],
+) -> SnapshotReport:
+    """Stream every object of `collection` with its vector into a Parquet file.
+
+    Args:
+        adapter (VectorDBSPI): A connected vector DB adapter.
+        collection (str): The collection to export.
+        path (Path): Snapshot file to write (replaced if it exists).
+        row_group_size (int): Objects buffered in memory per row group.
+        compression (str): Parquet codec.
+        compression_level (int, optional): Codec level.
+        clause_index_path (Path, optional): Clause index stored alongside,
+            since it is built by the same indexing run.
+
+    Returns:
+        SnapshotReport: Object count, vector size and file size.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    start = time.perf_counter()
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    schema = adapter.get_schema(collection)
+    property_types = _property_types(schema)
+    json_columns = _json_columns(schema)
+    report = SnapshotReport(collection, path)
+
+    metadata = {
+        _META_SCHEMA: json.dumps(schema, default=str).encode(),
+        _META_INFO: json.dumps({
+            "format_version": FORMAT_VERSION,
+            "collection": collection,
+            "exported_at": datetime.now(timezone.utc).isoformat(),
+        }).encode(),
+    }
+    if clause_index_path is not None and Path(clause_index_path).exists():
+        metadata[_META_CLAUSE_INDEX] = Path(clause_index_path).read_bytes()
+
+    writer = None
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    buffer: list = []
+    try:
+        for result in adapter.iterate_objects(collection, include_vector=True):
+            if result.vector is None:
+                raise VectorDBError(f"object {result.id} has no vector; cannot snapshot without re-embedding")
+            if report.dimensions is None:
+                report.dimensions = len(result.vector)
+                # the vector length is only known from the first object
+                arrow_schema = pa.schema(
+                    [pa.field(_ID_COLUMN, pa.string(), nullable=False)]
+                    + [pa.field(n, t) for n, t in property_types.items()]
+                    + [pa.field(_VECTOR_COLUMN, pa.list_(pa.float32(), report.dimensions), nullable=False)],
+                    metadata=metadata,
+                )
+                writer = pq.ParquetWriter(
+                    tmp_path, arrow_schema, compression=compression, compression_level=compression_level
+                )
+            buffer.append(result)
+            if len(buffer) >= row_group_size:
+                _write_row_group(writer, buffer, property_types, json_columns)
+                report.objects += len(buffer)
+                buffer = []
+        if writer is None:
+            raise VectorDBError(f"collection {collection} is empty")
+        if buffer:
+            _write_row_group(writer, buffer, property_types, json_columns)
+            report.objects += len(buffer)
+        writer.close()
+        writer = None
+        tmp_path.replace(path)
+    finally:
+        if writer is not None:
+            writer.close()
+        tmp_path.unlink(missing_ok=True)
+
+    report.file_bytes = path.stat().st_size
+    report.seconds = time.perf_counter() - start
+    logger.info(report.summary("Exported"))
+    return report
+
+
+def _write_row_group(writer: Any, results: list, property_types: dict, json_columns: set) -> None:
+    import pyarrow as pa
+
+    columns = {_ID_COLUMN: pa.array([str(r.id) for r in results], pa.string())}
+    for name, arrow_type in property_types.items():
+        json_column = name in json_columns
+        columns[name] = pa.array(
+            [_to_column_value((r.properties or {}).get(name), json_column) for r in results], arrow_type
+        )
+    dims = writer.schema.field(_VECTOR_COLUMN).type.list_size
+    flat = pa.array([x for r in results for x in _checked_vector(r, dims)], pa.float32())
+    columns[_VECTOR_COLUMN] = pa.FixedSizeListArray.from_arrays(flat, dims)
+    writer.write_table(pa.table(columns, schema=writer.schema), row_group_size=len(results))
+
+
+def _checked_vector(result: Any, dims: int) -> list[float]:
+    if result.vector is None or len(result.vector) != dims:
+        raise VectorDBError(f"object {result.id} has a vector of unexpected size")
+    return result.vector
+
+
+def read_snapshot_info(path: Path) -> dict:
+    """Collection definition and export details stored in a snapshot."""
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    metadata = parquet_file.schema_arrow.metadata or {}
+    if _META_SCHEMA not in metadata:
+        raise ValueError(f"{path} is not a collection snapshot")
+    info = json.loads(metadata[_META_INFO])
+    if info.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"unsupported snapshot format version: {info.get('format_version')}")
+    return {
+        **info,
+        "schema": json.loads(metadata[_META_SCHEMA]),
+        "objects": parquet_file.metadata.num_rows,
+        "dimensions": parquet_file.schema_arrow.field(_VECTOR_COLUMN).type.list_size,
+        "clause_index": metadata.get(_META_CLAUSE_INDEX),
+    }
+
+
+def _iter_batches(path: Path, batch_size: int, json_columns: set) -> Iterator[tuple[list, list, list]]:
+    import pyarrow.parquet as pq
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+        columns = batch.to_pydict()
+        ids = columns.pop(_ID_COLUMN)
+        vectors = columns.pop(_VECTOR_COLUMN)
+        objects = []
+        for i in range(len(ids)):
+            obj = {}
+            for name, values in columns.items():
+                value = values[i]
+                if value is None:
+                    continue  # absent property, not an explicit null
+                obj[name] = json.loads(value) if name in json_columns else value
+            objects.append(obj)
+        yield ids, objects, vectors
+
+
+def restore_collection(
+    adapter: VectorDBSPI,
+    path: Path,
+    *,
+    collection: Optional[str] = None,
+    replace: bool = False,
+    batch_size: int = SNAPSHOT_CONFIG["insert_batch_size"],
+    clause_index_path: Optional[Path] = CLAUSE_INDEX_CONFIG["path"],
+) -> SnapshotReport:
+    """Recreate a collection from a snapshot with its stored ids and vectors.
+
+    Only the target collection is touched: other collections survive, and an
+    existing collection of the same name is dropped only with `replace`.
+
+    Args:
+        adapter (VectorDBSPI): A connected vector DB adapter.
+        path (Path): Snapshot file written by export_collection().
+        collection (str, optional): Target name; defaults to the exported one.
+        replace (bool): Drop an existing collection of the same name first.
+        batch_size (int): Objects per insert batch.
+        clause_index_path (Path, optional): Where to restore the clause index
+            stored in the snapshot; None to leave it alone.
+
+    Returns:
+        SnapshotReport: Number of objects restored.
+
+    Raises:
+        VectorDBError: If the collection exists and `replace` is False, or if
+            the restored object count does not match the snapshot.
+    """
+    start = time.perf_counter()
+    path = Path(path)
+    info = read_snapshot_info(path)
+    schema = info["schema"]
+    collection = collection or info["collection"]
+    schema["class"] = collection
+    report = SnapshotReport(collection, path, dimensions=info["dimensions"], file_bytes=path.stat().st_size)
+
+    if adapter.collection_exists(collection):
+        if not replace:
+            raise VectorDBError(f"collection {collection} already exists; pass replace=True to overwrite it")
+        adapter.drop_collection(collection)
+    adapter.create_schema(schema)
+
+    json_columns = _json_columns(schema)
+    for ids, objects, vectors in _iter_batches(path, batch_size, json_columns):
+        adapter.insert_objects(collection, objects, batch_size=batch_size, vectors=vectors, uuids=ids)
+        report.objects += len(objects)
+        logger.info("Restored %d/%d objects", report.objects, info["objects"])
+
+    stored = adapter.count_objects(collection)
+    if stored != info["objects"]:
+        raise VectorDBError(f"restored {stored} objects into {collection}, snapshot holds {info['objects']}")
+    if clause_index_path is not None and info["clause_index"]:
+        Path(clause_index_path).parent.mkdir(parents=True, exist_ok=True)
+        Path(clause_index_path).write_bytes(info["clause_index"])
+    report.seconds = time.perf_counter() - start
+    logger.info(report.summary("Restored"))
+    return report
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import Sequence
+
+
+class EmbeddingSPI(ABC):
+    """Service Provider Interface (SPI) for text embedding providers.
+
+    Used to embed search queries in-process so the vector DB does not have to
+    call its vectorizer. Implementations must produce vectors in the same
+    space as the collection's vectorizer (same model, same input text).
+    """
+
+    @abstractmethod
+    def embed(self, texts: Sequence[str]) -> list[list[float]]:
+        """Embed a batch of texts.
+
+        Args:
+            texts: The texts to embed.
+
+        Returns:
+            One vector per text, in input order.
+        """
+        raise NotImplementedError()
+
+    def embed_query(self, query: str) -> list[float]:
+        """Embed a single search query."""
+        return self.embed([query])[0]
+
+
+__all__ = ["EmbeddingSPI"]
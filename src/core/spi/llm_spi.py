@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, Mapping
 
 
 class LLMSPI(ABC):
@@ -12,7 +12,7 @@ class LLMSPI(ABC):
     return a text response for a given prompt.
 
     Implementations may accept optional keyword arguments (for example
-    `max_tokens` or `temperature`) but are free to ignore unsupported keys.
+    `model`, `options` or `keep_alive`) but are free to ignore unsupported keys.
     """
 
     @abstractmethod
@@ -22,7 +22,12 @@ class LLMSPI(ABC):
         Args:
             prompt: The user-facing prompt or instruction to send to the LLM.
             system_message: The system message to include in the request.
-            **kwargs: Optional provider-specific options (e.g. max_tokens).
+            **kwargs: Optional provider-specific options. Commonly supported:
+                `model` (override the adapter's model for this call),
+                `options` (generation options such as num_ctx, num_predict,
+                temperature), `keep_alive` (how long the model stays loaded)
+                and `timeout` (seconds to wait for the response before raising
+                TimeoutError).
 
         Returns:
             The text response produced by the LLM.
@@ -32,6 +37,23 @@ class LLMSPI(ABC):
         """
         raise NotImplementedError()
 
+    def warm_up(
+        self,
+        models: Iterable[str] | None = None,
+        options: Mapping[str, Dict[str, Any]] | None = None,
+    ) -> None:
+        """Preload models so the first request does not pay the load time.
+
+        Optional; the default implementation does nothing.
+
+        Args:
+            models: Models to load, defaulting to the adapter's own model.
+            options: Generation options per model, as later requests will
+                pass them; providers that load a model per context size
+                need them to preload the right one.
+        """
+        return None
+
 
 class EchoLLM(LLMSPI):
     """A tiny, deterministic LLM implementation for testing and local use.
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Any, Iterable, Optional, Sequence
+from typing import Any, Iterable, Iterator, Optional, Sequence
 
 
 class VectorDBError(Exception):
@@ -21,12 +21,15 @@ class SearchResult:
 		distance: Optional distance metric (lower-is-better). If the backend
 				  returns a score instead, leave this as None.
 		id: Optional provider-specific object identifier.
+		vector: Optional stored embedding, only populated when explicitly
+				requested (e.g. `iterate_objects(include_vector=True)`).
 	"""
 
 	properties: dict[str, Any]
 	score: Optional[float] = None
 	distance: Optional[float] = None
 	id: Optional[str] = None
+	vector: Optional[list[float]] = None
 
 
 FilterSpec = Any  # Provider-specific filter structure (e.g., Weaviate Filter)
@@ -60,17 +63,40 @@ class VectorDBSPI(ABC):
 
 	# ---- Schema / Collections ----
 	@abstractmethod
-	def create_schema(self, schema: dict[str, Any]) -> None:
+	def create_schema(
+		self,
+		schema: dict[str, Any],
+		*,
+		vector_index_config: dict[str, Any] | None = None,
+	) -> None:
 		"""Create or update collections/classes per the provided schema.
 
 		Implementations may choose to drop existing conflicting collections.
 		The schema structure is provider-specific and passed through as-is.
+
+		Args:
+			schema: Provider-specific collection definition.
+			vector_index_config: Optional index tuning (ANN parameters and
+				vector quantization) applied on top of the schema. Backends
+				without such knobs may ignore it.
 		"""
 
+	@abstractmethod
+	def collection_exists(self, collection: str) -> bool:
+		"""Whether a collection/class of this name exists."""
+
+	@abstractmethod
+	def get_schema(self, collection: str) -> dict[str, Any]:
+		"""Return the collection definition in the format `create_schema` accepts."""
+
 	@abstractmethod
 	def drop_all_collections(self) -> None:
 		"""Drop all collections/classes in the database (destructive)."""
 
+	@abstractmethod
+	def drop_collection(self, collection: str) -> None:
+		"""Drop a single collection/class if it exists (destructive)."""
+
 	# ---- Ingest / Insert ----
 	@abstractmethod
 	def insert_objects(
@@ -79,6 +105,8 @@ class VectorDBSPI(ABC):
 		objects: Sequence[dict[str, Any]],
 		*,
 		batch_size: int | None = 100,
+		vectors: Sequence[Sequence[float]] | None = None,
+		uuids: Sequence[str] | None = None,
 	) -> None:
 		"""Insert a list of objects/documents into a collection.
 
@@ -86,8 +114,43 @@ class VectorDBSPI(ABC):
 			collection: Target collection/class name.
 			objects: Iterable of property dictionaries to insert.
 			batch_size: Optional batching hint for backends that support it.
+			vectors: Optional precomputed embeddings aligned with `objects`;
+				when given the backend must not re-vectorize the objects.
+			uuids: Optional object ids aligned with `objects` (e.g. when
+				restoring a snapshot); generated by the backend if omitted.
+
+		Raises:
+			VectorDBError: If objects could not be inserted.
+		"""
+
+	@abstractmethod
+	def iterate_objects(
+		self,
+		collection: str,
+		*,
+		include_vector: bool = False,
+	) -> Iterator[SearchResult]:
+		"""Stream every object stored in a collection.
+
+		Args:
+			collection: Source collection/class name.
+			include_vector: Whether to populate `SearchResult.vector`.
 		"""
 
+	@abstractmethod
+	def count_objects(self, collection: str) -> int:
+		"""Return the number of objects stored in a collection."""
+
+	@abstractmethod
+	def fetch_objects(
+		self,
+		collection: str,
+		*,
+		limit: int = 10,
+		filters: FilterSpec | None = None,
+	) -> list[SearchResult]:
+		"""Fetch objects matching `filters` without any ranking query."""
+
 	# ---- Search ----
 	@abstractmethod
 	def search_bm25(
@@ -112,12 +175,28 @@ class VectorDBSPI(ABC):
 		limit: int = 10,
 		filters: FilterSpec | None = None,
 		return_distance: bool = True,
+		query_vector: Sequence[float] | None = None,
 	) -> list[SearchResult]:
 		"""Vector similarity search for a natural language query.
 
-		Implementations may choose the best mapping (e.g., near_text).
+		Implementations may choose the best mapping (e.g., near_text). When
+		`query_vector` is given (the query embedded by the caller with the
+		collection's embedding model) it is searched directly instead of
+		having the database embed `query`.
 		"""
 
+	@abstractmethod
+	def search_near_vector(
+		self,
+		collection: str,
+		vector: Sequence[float],
+		*,
+		limit: int = 10,
+		filters: FilterSpec | None = None,
+		return_distance: bool = True,
+	) -> list[SearchResult]:
+		"""Vector similarity search for a precomputed query embedding."""
+
 	@abstractmethod
 	def search_hybrid(
 		self,
@@ -126,8 +205,13 @@ class VectorDBSPI(ABC):
 		*,
 		limit: int = 10,
 		filters: FilterSpec | None = None,
+		query_vector: Sequence[float] | None = None,
 	) -> list[SearchResult]:
-		"""Hybrid (keyword + vector) search for the query string."""
+		"""Hybrid (keyword + vector) search for the query string.
+
+		`query_vector`, if given, is used for the vector part instead of
+		having the database embed `query`; the keyword part still uses `query`.
+		"""
 
 
 __all__ = [
@@ -0,0 +1,208 @@
+"""Request scheduler shared by the LLM adapters of one process.
+
+`LLMScheduler` bounds the number of concurrent requests sent to an LLM
+server (e.g. to Ollama's `OLLAMA_NUM_PARALLEL`), serves interactive requests
+before batch ones, coalesces identical in-flight requests into one call, and
+retries transient failures with exponential backoff. Requests submitted with a
+deadline are dropped with a `TimeoutError` if it passes while they wait in the
+queue, and are not retried past it, so callers that gave up do not keep
+occupying the server. `metrics()` exposes the queue depth and counters for
+monitoring.
+"""
+
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Lower value is served first.
+PRIORITY_LANES = {
+    "interactive": 0,
+    "batch": 1,
+}
+
+
+@dataclass(order=True)
+class _Task:
+    priority: int
+    seq: int
+    key: Hashable = field(compare=False)
+    fn: Callable[[], Any] = field(compare=False)
+    future: Future = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    # time.monotonic() after which the request is not worth starting; None = no deadline
+    deadline: Optional[float] = field(default=None, compare=False)
+
+
+class LLMScheduler:
+    """Priority queue drained by a fixed number of worker threads.
+
+    Args:
+        max_concurrency: Number of requests allowed in flight at once.
+        max_retries: Retries per request for errors accepted by `retryable`.
+        backoff: Base delay in seconds, doubled on every retry (with jitter).
+        backoff_max: Upper bound for a single retry delay.
+        retryable: Predicate deciding whether an exception is transient.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        *,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        backoff_max: float = 30.0,
+        retryable: Callable[[Exception], bool] = lambda e: False,
+    ) -> None:
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.retryable = retryable
+        self._queue: list[_Task] = []
+        self._inflight: dict[Hashable, _Task] = {}
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._workers: list[threading.Thread] = []
+        self._counters = {
+            "submitted": 0,
+            "coalesced": 0,
+            "completed": 0,
+            "failed": 0,
+            "retries": 0,
+            "expired": 0,
+            "running": 0,
+            "max_queue_depth": 0,
+        }
+        self._queue_wait_total = 0.0
+
+    def submit(
+        self,
+        key: Hashable,
+        fn: Callable[[], Any],
+        priority: str = "interactive",
+        deadline: Optional[float] = None,
+    ) -> Future:
+        """Schedule `fn` and return a future for its result.
+
+        Requests with the same `key` that are queued or running share a single
+        call and future; a queued call moves to the most urgent lane among its
+        callers. A request still queued at `deadline` (a
+        `time.monotonic()` value) fails with `TimeoutError` without being run.
+        """
+        if priority not in PRIORITY_LANES:
+            raise ValueError(f"unknown priority lane: {priority}")
+        with self._cond:
+            self._counters["submitted"] += 1
+            existing = self._inflight.get(key)
+            if existing is not None:
+                self._counters["coalesced"] += 1
+                # the shared call must stay eligible for the most patient caller
+                if existing.deadline is not None:
+                    existing.deadline = None if deadline is None else max(existing.deadline, deadline)
+                # an interactive caller must not wait in the batch lane behind batch work
+                if PRIORITY_LANES[priority] < existing.priority:
+                    existing.priority = PRIORITY_LANES[priority]
+                    heapq.heapify(self._queue)
+                return existing.future
+            future: Future = Future()
+            task = _Task(PRIORITY_LANES[priority], next(self._seq), key, fn, future, time.monotonic(), deadline)
+            self._inflight[key] = task
+            heapq.heappush(self._queue, task)
+            self._counters["max_queue_depth"] = max(self._counters["max_queue_depth"], len(self._queue))
+            self._ensure_workers()
+            self._cond.notify()
+        return future
+
+    def queue_depth(self) -> int:
+        with self._cond:
+            return len(self._queue)
+
+    def metrics(self) -> dict[str, Any]:
+        """Snapshot of queue depth per lane and request counters."""
+        with self._cond:
+            depth = {lane: 0 for lane in PRIORITY_LANES}
+            lanes = {v: k for k, v in PRIORITY_LANES.items()}
+            for task in self._queue:
+                depth[lanes[task.priority]] += 1
+            started = self._counters["completed"] + self._counters["failed"] + self._counters["running"]
+            return {
+                **self._counters,
+                "queue_depth": len(self._queue),
+                "queue_depth_by_lane": depth,
+                "max_concurrency": self.max_concurrency,
+                "mean_queue_wait_seconds": self._queue_wait_total / started if started else 0.0,
+            }
+
+    def _ensure_workers(self) -> None:
+        # called with the condition held; workers are started on first use
+        while len(self._workers) < self.max_concurrency:
+            worker = threading.Thread(
+                target=self._work, name=f"llm-scheduler-{len(self._workers)}", daemon=True
+            )
+            self._workers.append(worker)
+            worker.start()
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                task = heapq.heappop(self._queue)
+                now = time.monotonic()
+                expired = task.deadline is not None and now >= task.deadline
+                if expired:
+                    self._counters["expired"] += 1
+                    self._inflight.pop(task.key, None)
+                else:
+                    self._counters["running"] += 1
+                    self._queue_wait_total += now - task.enqueued_at
+            if expired:
+                task.future.set_exception(
+                    TimeoutError(f"deadline passed after {now - task.enqueued_at:.1f}s in the queue")
+                )
+                continue
+            try:
+                result = self._call_with_retries(task)
+            except BaseException as e:
+                self._finish(task, failed=True)
+                task.future.set_exception(e)
+            else:
+                self._finish(task, failed=False)
+                task.future.set_result(result)
+
+    def _finish(self, task: _Task, failed: bool) -> None:
+        with self._cond:
+            self._counters["running"] -= 1
+            self._counters["failed" if failed else "completed"] += 1
+            # new identical requests after this point start a fresh call
+            self._inflight.pop(task.key, None)
+
+    def _call_with_retries(self, task: _Task) -> Any:
+        attempt = 0
+        while True:
+            try:
+                return task.fn()
+            except Exception as e:
+                if attempt >= self.max_retries or not self.retryable(e):
+                    raise
+                delay = min(self.backoff * 2 ** attempt, self.backoff_max) * random.uniform(0.5, 1.0)
+                attempt += 1
+                with self._cond:
+                    # read under the lock: coalesced callers may extend the deadline
+                    deadline = task.deadline
+                    if deadline is not None and time.monotonic() + delay >= deadline:
+                        self._counters["expired"] += 1
+                        raise TimeoutError(f"deadline passes before retry {attempt}") from e
+                    self._counters["retries"] += 1
+                logger.warning("LLM request failed (%s), retry %d in %.1fs", e, attempt, delay)
+                time.sleep(delay)
@@ -1,19 +1,85 @@
+from __future__ import annotations
+
 import sys
 sys.path.append("/home/kosala/git-repos/contract_inspect/")
+import json
+import threading
+import time
+from typing import TYPE_CHECKING
 import src.core.spi.llm_spi as llm_spi
-from ollama import chat
-from ollama import ChatResponse 
 from core.config import LLM_SYSTEM_MESSAGES, LLM_CONFIG
+from src.sp_adapters.llm_scheduler import LLMScheduler
+
+# ollama/httpx are imported when the first client is created, keeping module
+# import cheap (see weaviate_adapter.py).
+if TYPE_CHECKING:
+    from ollama import ChatResponse, Client
+
+# One client and scheduler per Ollama host, shared by all adapter instances so
+# the concurrency limit holds for the whole process.
+_schedulers: dict[str, tuple[Client, LLMScheduler]] = {}
+_schedulers_lock = threading.Lock()
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Retry on connection problems, timeouts and server-side overload."""
+    import httpx
+    from ollama import ResponseError
+
+    if isinstance(error, ResponseError):
+        return error.status_code == 429 or error.status_code >= 500
+    return isinstance(error, (httpx.TransportError, ConnectionError))
+
+
+def get_scheduler(host: str = LLM_CONFIG['host']) -> tuple[Client, LLMScheduler]:
+    """Return the shared Ollama client and request scheduler for `host`."""
+    with _schedulers_lock:
+        if host not in _schedulers:
+            from ollama import Client
+
+            client = Client(host=host, timeout=LLM_CONFIG['timeout'])
+            scheduler = LLMScheduler(
+                LLM_CONFIG['num_parallel'],
+                max_retries=LLM_CONFIG['max_retries'],
+                backoff=LLM_CONFIG['retry_backoff'],
+                backoff_max=LLM_CONFIG['retry_backoff_max'],
+                retryable=_is_retryable,
+            )
+            _schedulers[host] = (client, scheduler)
+        return _schedulers[host]
+
 
 class OllamaLLMSPAdapter(llm_spi.LLMSPI):
     """An implementation of the LLMSPI interface for the Ollama LLM provider.
 
     This adapter allows the retriever and query parser components to invoke
-    the Ollama language model using a consistent interface.
+    the Ollama language model using a consistent interface. Requests go
+    through a process-wide scheduler (see llm_scheduler.py); `priority`
+    selects the lane ("interactive" or "batch") and can be overridden per
+    call with the `priority` keyword argument.
+
+    Passing `context` (token list from a previous response, `[]` to start)
+    switches from the chat endpoint to the generate endpoint, which returns
+    a GenerateResponse (`response`, `context`) instead of a ChatResponse.
+
+    `timeout` (seconds) bounds the whole call including the time spent in the
+    scheduler queue; on expiry `TimeoutError` is raised and a request that has
+    not started yet is dropped from the queue.
     """
 
-    def __init__(self, model: str = LLM_CONFIG['model']) -> None:
+    def __init__(
+        self,
+        model: str = LLM_CONFIG['model'],
+        priority: str = "interactive",
+        host: str = LLM_CONFIG['host'],
+        options: dict | None = None,
+        keep_alive: str | float = LLM_CONFIG['keep_alive']
+    ) -> None:
         self.model = model
+        self.priority = priority
+        self.options = dict(LLM_CONFIG['options'] if options is None else options)
+        self.keep_alive = keep_alive
+        self.client, self.scheduler = get_scheduler(host)
 
     def invoke_llm(self, prompt: str, system_message: str=None, **kwargs: any) -> ChatResponse:
 
@@ -29,8 +95,62 @@ class OllamaLLMSPAdapter(llm_spi.LLMSPI):
             {'role': 'user', 'content': prompt}
         )
 
-        response: ChatResponse = chat(
-            model=self.model, 
-            messages=messages
+        model = kwargs.get("model", self.model)
+        options = {**self.options, **(kwargs.get("options") or {})}
+        keep_alive = kwargs.get("keep_alive", self.keep_alive)
+        context = kwargs.get("context")
+
+        # identical in-flight requests are coalesced into one call
+        key = (model, json.dumps(messages), json.dumps(options, sort_keys=True), keep_alive)
+        if context is None:
+            call = lambda: self.client.chat(
+                model=model,
+                messages=messages,
+                options=options,
+                keep_alive=keep_alive
+            )
+        else:
+            # continue from a previous response's KV state: the generate endpoint
+            # accepts the token context returned by the last call, so only the
+            # new prompt tokens are evaluated
+            key += (tuple(context),)
+            call = lambda: self.client.generate(
+                model=model,
+                prompt=prompt,
+                system=system_message,
+                context=context,
+                options=options,
+                keep_alive=keep_alive
+            )
+        timeout = kwargs.get("timeout")
+        deadline = None if timeout is None else time.monotonic() + timeout
+        future = self.scheduler.submit(
+            key,
+            call,
+            priority=kwargs.get("priority", self.priority),
+            deadline=deadline,
+        )
+        # concurrent.futures.TimeoutError is the builtin TimeoutError
+        response: ChatResponse = future.result(
+            timeout=None if deadline is None else max(0.0, deadline - time.monotonic())
         )
         return response
+
+    def warm_up(self, models=None, options=None) -> None:
+        """Load the models into Ollama memory with the configured keep_alive.
+
+        A chat request without messages makes Ollama load the model and return
+        immediately. The options are merged like in invoke_llm, since Ollama
+        reloads the model when a request asks for a different num_ctx.
+        """
+        for model in models or [self.model]:
+            self.client.chat(
+                model=model,
+                messages=[],
+                options={**self.options, **((options or {}).get(model) or {})},
+                keep_alive=self.keep_alive
+            )
+
+    def metrics(self) -> dict:
+        """Queue depth and request counters of the shared scheduler."""
+        return self.scheduler.metrics()
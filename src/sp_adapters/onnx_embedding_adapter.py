@@ -0,0 +1,171 @@
+"""In-process query embeddings with ONNX Runtime.
+
+`OnnxEmbeddingAdapter` runs the ONNX export of the collection's vectorizer
+model (nomic-embed-text v1.5) on the CPU, so vector and hybrid searches can
+pass a ready query vector to Weaviate instead of having it call Ollama, which
+also keeps query embedding off the Ollama server that serves generation.
+
+Output parity with the server-side path is checked with `check_parity`: the
+same texts are embedded by Ollama and compared by cosine similarity.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Sequence
+
+from src.core.config import LLM_CONFIG, QUERY_EMBEDDING_CONFIG
+from src.core.spi.embedding_spi import EmbeddingSPI
+
+# numpy/onnxruntime/tokenizers are imported on load(), see weaviate_adapter.py.
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class OnnxEmbeddingAdapter(EmbeddingSPI):
+    """Mean-pooled, L2-normalised sentence embeddings from an ONNX model.
+
+    The model and tokenizer are downloaded from the Hugging Face Hub (and
+    cached there) on `load()`, which `embed` calls on first use. Recently
+    embedded texts are kept in an LRU cache, since batch runs search the same
+    extracted entities for every document.
+    """
+
+    def __init__(
+        self,
+        repo_id: str = QUERY_EMBEDDING_CONFIG['repo_id'],
+        onnx_file: str = QUERY_EMBEDDING_CONFIG['onnx_file'],
+        *,
+        query_prefix: str = QUERY_EMBEDDING_CONFIG['query_prefix'],
+        max_length: int = QUERY_EMBEDDING_CONFIG['max_length'],
+        batch_size: int = QUERY_EMBEDDING_CONFIG['batch_size'],
+        intra_op_threads: int = QUERY_EMBEDDING_CONFIG['intra_op_threads'],
+        cache_size: int = QUERY_EMBEDDING_CONFIG['cache_size'],
+    ) -> None:
+        self.repo_id = repo_id
+        self.onnx_file = onnx_file
+        self.query_prefix = query_prefix
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.intra_op_threads = intra_op_threads
+        self.cache_size = cache_size
+        self._session = None
+        self._tokenizer = None
+        self._input_names: set[str] = set()
+        self._cache: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self) -> OnnxEmbeddingAdapter:
+        """Download (if needed) and load the model and tokenizer."""
+        with self._lock:
+            if self._session is not None:
+                return self
+            import onnxruntime as ort
+            from huggingface_hub import hf_hub_download
+            from tokenizers import Tokenizer
+
+            tokenizer = Tokenizer.from_file(hf_hub_download(self.repo_id, "tokenizer.json"))
+            tokenizer.enable_truncation(max_length=self.max_length)
+            pad_id = tokenizer.token_to_id("[PAD]") or 0
+            tokenizer.enable_padding(pad_id=pad_id, pad_token="[PAD]")
+
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            options.intra_op_num_threads = self.intra_op_threads
+            options.inter_op_num_threads = 1
+            session = ort.InferenceSession(
+                hf_hub_download(self.repo_id, self.onnx_file),
+                sess_options=options,
+                providers=["CPUExecutionProvider"],
+            )
+            self._input_names = {i.name for i in session.get_inputs()}
+            self._tokenizer = tokenizer
+            self._session = session
+            logger.info("Loaded %s/%s for query embedding", self.repo_id, self.onnx_file)
+        return self
+
+    def embed(self, texts: Sequence[str]) -> list[list[float]]:
+        """Embed `texts`, running uncached ones in batches of `batch_size`."""
+        self.load()
+        texts = [self.query_prefix + t for t in texts]
+        with self._lock:
+            vectors = {t: self._cache[t] for t in texts if t in self._cache}
+            for t in vectors:
+                self._cache.move_to_end(t)
+        # sorting by length keeps the padding per batch small
+        missing = sorted(set(texts) - vectors.keys(), key=len)
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            vectors.update(zip(batch, self._run(batch).tolist()))
+        with self._lock:
+            for t in missing:
+                self._cache[t] = vectors[t]
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return [vectors[t] for t in texts]
+
+    def _run(self, texts: list[str]) -> np.ndarray:
+        import numpy as np
+
+        encodings = self._tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        hidden = self._session.run(None, feeds)[0]  # (batch, tokens, dim)
+        mask = attention_mask[..., None].astype(hidden.dtype)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+
+def ollama_embedder(
+    model: str = QUERY_EMBEDDING_CONFIG['ollama_model'],
+    host: str = LLM_CONFIG['host'],
+) -> Callable[[list[str]], list[list[float]]]:
+    """Embed texts with Ollama, as Weaviate's text2vec-ollama vectorizer does."""
+    from src.sp_adapters.ollama_llm_sp_adapter import get_scheduler
+
+    client, _ = get_scheduler(host)
+    return lambda texts: client.embed(model=model, input=texts)["embeddings"]
+
+
+def _cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = (sum(x * x for x in a) * sum(y * y for y in b)) ** 0.5
+    return dot / norm if norm else 0.0
+
+
+def check_parity(
+    embedder: EmbeddingSPI,
+    texts: Sequence[str] = QUERY_EMBEDDING_CONFIG['parity_texts'],
+    reference: Callable[[list[str]], list[list[float]]] | None = None,
+) -> list[float]:
+    """Cosine similarity between `embedder` and the reference (Ollama) per text."""
+    reference = reference or ollama_embedder()
+    expected = reference(list(texts))
+    actual = embedder.embed(list(texts))
+    if len(expected[0]) != len(actual[0]):
+        raise ValueError(f"dimension mismatch: {len(actual[0])} locally, {len(expected[0])} from the reference")
+    return [_cosine(a, e) for a, e in zip(actual, expected)]
+
+
+def verify_parity(
+    embedder: EmbeddingSPI,
+    min_cosine: float = QUERY_EMBEDDING_CONFIG['parity_min_cosine'],
+    texts: Sequence[str] = QUERY_EMBEDDING_CONFIG['parity_texts'],
+) -> bool:
+    """Return whether `embedder` reproduces the Ollama vectors closely enough."""
+    cosines = check_parity(embedder, texts)
+    if min(cosines) < min_cosine:
+        logger.error(
+            "Local query embeddings differ from %s (min cosine %.4f < %.4f)",
+            QUERY_EMBEDDING_CONFIG['ollama_model'], min(cosines), min_cosine,
+        )
+        return False
+    logger.info("Local query embeddings match Ollama (min cosine %.4f)", min(cosines))
+    return True
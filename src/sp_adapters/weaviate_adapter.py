@@ -1,9 +1,47 @@
-from typing import Any, Sequence
-import weaviate
-from weaviate.classes.query import MetadataQuery
-from weaviate.classes.init import AdditionalConfig    
-from weaviate import WeaviateClient                   
+from __future__ import annotations
+
+import copy
+from typing import TYPE_CHECKING, Any, Iterator, Sequence
 from src.core.spi.vector_db_spi import VectorDBSPI, SearchResult, VectorDBError, FilterSpec
+from src.core.config import WEAVIATE_QUANTIZATION_OPTIONS
+
+# weaviate (grpc, pydantic, httpx) is imported on first use so that importing
+# this module stays cheap for processes that never connect.
+if TYPE_CHECKING:
+    import weaviate
+
+_HNSW_KEYS = ("ef", "efConstruction", "maxConnections")
+# Quantizers that re-rank candidates against the full-precision vectors.
+_RESCORING_QUANTIZERS = ("bq", "sq")
+
+
+def build_vector_index_config(index_config: dict[str, Any]) -> dict[str, Any]:
+    """Translate a WEAVIATE_VECTOR_INDEX_CONFIG-style dict into Weaviate's
+    `vectorIndexConfig` schema representation.
+
+    Args:
+        index_config: HNSW parameters plus a `quantization` name ("none",
+            "pq", "bq" or "sq"), an optional `rescoreLimit` and optional
+            `quantizerOptions` overriding the preset quantizer settings.
+
+    Returns:
+        The `vectorIndexConfig` dictionary accepted by `create_from_dict`.
+    """
+    quantization = index_config.get("quantization") or "none"
+    if quantization not in WEAVIATE_QUANTIZATION_OPTIONS:
+        raise ValueError(f"unsupported quantization: {quantization}")
+
+    out = {k: index_config[k] for k in _HNSW_KEYS if index_config.get(k) is not None}
+    if quantization != "none":
+        quantizer = {
+            **WEAVIATE_QUANTIZATION_OPTIONS[quantization],
+            **index_config.get("quantizerOptions", {}),
+        }
+        if quantization in _RESCORING_QUANTIZERS and index_config.get("rescoreLimit") is not None:
+            quantizer["rescoreLimit"] = index_config["rescoreLimit"]
+        out[quantization] = quantizer
+    return out
+
 
 class WeaviateVectorDBAdapter(VectorDBSPI):
     def __init__(self, **connect_kwargs: Any) -> None:
@@ -11,6 +49,8 @@ class WeaviateVectorDBAdapter(VectorDBSPI):
         self._connect_kwargs = connect_kwargs
 
     def connect(self) -> None:
+        import weaviate
+
         # Default to local unless overridden by kwargs
         self._client = weaviate.connect_to_local(**self._connect_kwargs)
 
@@ -24,21 +64,88 @@ class WeaviateVectorDBAdapter(VectorDBSPI):
             raise VectorDBError("Weaviate client not connected")
         return self._client
 
-    def create_schema(self, schema: dict[str, Any]) -> None:
+    def create_schema(self, schema: dict[str, Any], *, vector_index_config: dict[str, Any] | None = None) -> None:
         client = self._require()
+        if vector_index_config is not None:
+            schema = copy.deepcopy(schema)
+            schema.setdefault("vectorIndexType", "hnsw")
+            schema["vectorIndexConfig"] = {
+                **schema.get("vectorIndexConfig", {}),
+                **build_vector_index_config(vector_index_config),
+            }
         client.collections.create_from_dict(schema)
 
+    def collection_exists(self, collection: str) -> bool:
+        client = self._require()
+        return client.collections.exists(collection)
+
+    def get_schema(self, collection: str) -> dict[str, Any]:
+        client = self._require()
+        return client.collections.get(collection).config.get().to_dict()
+
     def drop_all_collections(self) -> None:
         client = self._require()
         client.collections.delete_all()
 
-    def insert_objects(self, collection: str, objects: Sequence[dict[str, Any]], *, batch_size: int | None = 100) -> None:
+    def drop_collection(self, collection: str) -> None:
+        client = self._require()
+        client.collections.delete(collection)
+
+    def insert_objects(self, collection: str, objects: Sequence[dict[str, Any]], *, batch_size: int | None = 100, vectors: Sequence[Sequence[float]] | None = None, uuids: Sequence[str] | None = None) -> None:
         client = self._require()
         pages = client.collections.get(collection)
         bs = 100 if batch_size is None else int(batch_size)
+        if vectors is not None and len(vectors) != len(objects):
+            raise VectorDBError("vectors must be aligned with objects")
+        if uuids is not None and len(uuids) != len(objects):
+            raise VectorDBError("uuids must be aligned with objects")
         with pages.batch.fixed_size(batch_size=bs) as batch:
-            for obj in objects:
-                batch.add_object(obj)
+            for i, obj in enumerate(objects):
+                batch.add_object(
+                    obj,
+                    uuid=None if uuids is None else uuids[i],
+                    vector=None if vectors is None else list(vectors[i]),
+                )
+        failed = pages.batch.failed_objects
+        if failed:
+            raise VectorDBError(f"{len(failed)} of {len(objects)} objects failed to insert: {failed[0].message}")
+
+    def iterate_objects(self, collection: str, *, include_vector: bool = False) -> Iterator[SearchResult]:
+        client = self._require()
+        pages = client.collections.get(collection)
+        for o in pages.iterator(include_vector=include_vector):
+            vector = o.vector.get("default") if include_vector and o.vector else None
+            yield SearchResult(properties=o.properties, id=str(o.uuid), vector=vector)
+
+    def count_objects(self, collection: str) -> int:
+        client = self._require()
+        return client.collections.get(collection).aggregate.over_all(total_count=True).total_count
+
+    def shard_status(self, collection: str) -> list[dict[str, Any]]:
+        """Indexing state of every shard of `collection` across the cluster nodes.
+
+        Weaviate-specific: `compressed` tells whether PQ/SQ training has run
+        and the vectors are held in compressed form.
+        """
+        client = self._require()
+        return [
+            {
+                "name": shard.name,
+                "node": node.name,
+                "object_count": shard.object_count,
+                "vector_indexing_status": shard.vector_indexing_status,
+                "vector_queue_length": shard.vector_queue_length,
+                "compressed": shard.compressed,
+            }
+            for node in client.cluster.nodes(collection=collection, output="verbose")
+            for shard in node.shards or []
+        ]
+
+    def fetch_objects(self, collection: str, *, limit: int = 10, filters: FilterSpec | None = None) -> list[SearchResult]:
+        client = self._require()
+        pages = client.collections.get(collection)
+        resp = pages.query.fetch_objects(limit=limit, filters=filters)
+        return [SearchResult(properties=o.properties, id=o.uuid) for o in resp.objects]
 
     def search_bm25(self, collection: str, query: str, *, limit: int = 10, filters: FilterSpec | None = None) -> list[SearchResult]:
         client = self._require()
@@ -46,9 +153,14 @@ class WeaviateVectorDBAdapter(VectorDBSPI):
         resp = pages.query.bm25(query=query, limit=limit, filters=filters)
         return [SearchResult(properties=o.properties, id=o.uuid) for o in resp.objects]
 
-    def search_vector(self, collection: str, query: str, *, limit: int = 10, filters: FilterSpec | None = None, return_distance: bool = True) -> list[SearchResult]:
+    def search_vector(self, collection: str, query: str, *, limit: int = 10, filters: FilterSpec | None = None, return_distance: bool = True, query_vector: Sequence[float] | None = None) -> list[SearchResult]:
+        if query_vector is not None:
+            # embedded by the caller: skip the vectorizer round-trip
+            return self.search_near_vector(collection, query_vector, limit=limit, filters=filters, return_distance=return_distance)
         client = self._require()
         pages = client.collections.get(collection)
+        from weaviate.classes.query import MetadataQuery
+
         meta = MetadataQuery(distance=True) if return_distance else None
         resp = pages.query.near_text(query=query, limit=limit, filters=filters, return_metadata=meta)
         out: list[SearchResult] = []
@@ -57,8 +169,22 @@ class WeaviateVectorDBAdapter(VectorDBSPI):
             out.append(SearchResult(properties=o.properties, distance=dist, id=o.uuid))
         return out
 
-    def search_hybrid(self, collection: str, query: str, *, limit: int = 10, filters: FilterSpec | None = None) -> list[SearchResult]:
+    def search_near_vector(self, collection: str, vector: Sequence[float], *, limit: int = 10, filters: FilterSpec | None = None, return_distance: bool = True) -> list[SearchResult]:
+        client = self._require()
+        pages = client.collections.get(collection)
+        from weaviate.classes.query import MetadataQuery
+
+        meta = MetadataQuery(distance=True) if return_distance else None
+        resp = pages.query.near_vector(near_vector=list(vector), limit=limit, filters=filters, return_metadata=meta)
+        out: list[SearchResult] = []
+        for o in resp.objects:
+            dist = getattr(o.metadata, "distance", None) if hasattr(o, "metadata") else None
+            out.append(SearchResult(properties=o.properties, distance=dist, id=o.uuid))
+        return out
+
+    def search_hybrid(self, collection: str, query: str, *, limit: int = 10, filters: FilterSpec | None = None, query_vector: Sequence[float] | None = None) -> list[SearchResult]:
         client = self._require()
         pages = client.collections.get(collection)
-        resp = pages.query.hybrid(query=query, limit=limit, filters=filters)
+        vector = list(query_vector) if query_vector is not None else None
+        resp = pages.query.hybrid(query=query, vector=vector, limit=limit, filters=filters)
         return [SearchResult(properties=o.properties, id=o.uuid) for o in resp.objects]
\ No newline at end of file
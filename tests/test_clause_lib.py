@@ -0,0 +1,111 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # repository root, for `src.` imports
+
+import pytest
+
+from src.core.retriver.util.clause_lib import ClauseStore, parse_date, route_query
+
+
+def _record(file_name: str, name: str, provider: str, id: str) -> dict:
+    return {"id": id, "name": name, "file_name": file_name, "provider": provider, "clauses": {}}
+
+
+ORACLE = _record("Oracle_Cloud_Agreement.pdf", "Oracle Cloud Agreement", "Oracle", "SA-001")
+AWS = _record("AWS_Customer_Agreement.pdf", "AWS Customer Agreement", "AWS", "SA-002")
+
+
+@pytest.mark.parametrize(
+    "query, field",
+    [
+        ("What is the effective date of the Oracle agreement?", "effective_date"),
+        ("When does the agreement start?", "effective_date"),
+        ("When does the Oracle contract expire?", "expiration_date"),
+        ("What is the termination notice period?", "termination_notice"),
+        ("How many days notice are needed to terminate?", "termination_notice"),
+        ("What is the governing law?", "governing_law"),
+        ("Which law governs the agreement?", "governing_law"),
+        ("What are the renewal terms?", "renewal"),
+    ],
+)
+def test_route_query_lookups(query, field):
+    assert route_query(query) == field
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        # yes/no questions
+        "Can Oracle terminate without notice?",
+        "Does the agreement renew automatically?",
+        # compound and conditional questions
+        "What are the termination fees and notice?",
+        "What notice is required to terminate for convenience?",
+        "What is the notice period if Oracle is in breach?",
+        # not a single clause
+        "Why was the governing law chosen?",
+        "Compare the expiration dates of all agreements",
+        "What notice is required to terminate?",
+        "What services are covered?",
+    ],
+)
+def test_route_query_falls_back_to_rag(query):
+    assert route_query(query) is None
+
+
+def test_resolve_document_single_agreement_unnamed():
+    store = ClauseStore(Path("unused.json"), {ORACLE["file_name"]: ORACLE})
+    assert store.resolve_document("When does the agreement expire?") is ORACLE
+    assert store.resolve_document("What is the governing law?") is ORACLE
+    assert store.resolve_document("What is the governing law of the Oracle Cloud agreement?") is ORACLE
+    assert store.resolve_document("When does Oracle expire?") is ORACLE
+    # defined terms are capitalised in contracts but name no agreement
+    assert store.resolve_document("What is the Effective Date of the Agreement?") is ORACLE
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "What is the governing law of the Microsoft Azure agreement?",
+        "When does the AWS contract expire?",
+        "What is the notice period in the agreement with Microsoft?",
+        "What is the governing law of Azure?",
+        "When does AWS expire?",
+        "What is the governing law for Microsoft Azure?",
+        "When does the Salesforce subscription expire?",
+        "What is the termination notice period in the Google Cloud terms?",
+    ],
+)
+def test_resolve_document_single_agreement_other_named(query):
+    store = ClauseStore(Path("unused.json"), {ORACLE["file_name"]: ORACLE})
+    assert store.resolve_document(query) is None
+
+
+def test_resolve_document_several_agreements():
+    store = ClauseStore(Path("unused.json"), {r["file_name"]: r for r in (ORACLE, AWS)})
+    assert store.resolve_document("When does the AWS contract expire?") is AWS
+    assert store.resolve_document("What is the governing law of SA-001?") is ORACLE
+    assert store.resolve_document("When does the agreement expire?") is None
+    assert store.resolve_document("Compare the Oracle and AWS agreements") is None
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("January 1, 2025", "2025-01-01"),
+        ("Jan. 15, 2025", "2025-01-15"),
+        ("1st day of January, 2025", "2025-01-01"),
+        ("31 December 2026", "2026-12-31"),
+        ("2025-03-04", "2025-03-04"),
+        ("03/04/2025", "2025-03-04"),
+        ("September 2nd 2025", "2025-09-02"),
+    ],
+)
+def test_parse_date(text, expected):
+    assert parse_date(text) == expected
+
+
+@pytest.mark.parametrize("text", ["February 30, 2025", "thirty days", "2025", "13/01/2025", ""])
+def test_parse_date_rejects_non_dates(text):
+    assert parse_date(text) is None
@@ -0,0 +1,72 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # repository root, for `src.` imports
+
+from src.core.deadline import (
+    DEADLINE_EXCEEDED,
+    SKIP_ENTITY_EXTRACTION,
+    Deadline,
+    LatencyEstimates,
+    plan_request,
+)
+
+ESTIMATES = {
+    "entity_extraction": 1.5,
+    "search_hybrid": 0.4,
+    "search_vector": 0.3,
+    "search_bm25": 0.1,
+    "generation_base": 1.0,
+    "generation_per_passage": 0.3,
+    "generation_per_token": 0.03,
+}
+CONFIG = {"min_limit": 1, "min_num_predict": 64}
+
+
+def _plan(seconds: float, loaded: bool = False):
+    estimates = LatencyEstimates(ESTIMATES, smoothing=0.2)
+    plan = plan_request(Deadline(seconds), "hybrid", 3, 512, loaded=loaded, estimates=estimates, config=CONFIG)
+    return plan, estimates
+
+
+def test_plan_within_budget_is_not_degraded():
+    plan, _ = _plan(60)
+    assert plan.fits
+    assert plan.degradations == []
+    assert (plan.use_entity_extraction, plan.query_type, plan.limit, plan.num_predict) == (True, "hybrid", 3, 512)
+
+
+def test_plan_caps_output_tokens_before_passages():
+    # 1.5 + 0.4 + 1.0 + 0.9 + 15.36 > 12: skip extraction, BM25, then fewer tokens
+    plan, estimates = _plan(12)
+    assert plan.fits
+    assert plan.degradations[:2] == [SKIP_ENTITY_EXTRACTION, "query_type:hybrid->bm25"]
+    assert plan.limit == 3
+    assert 64 <= plan.num_predict < 512
+    assert plan.expected_seconds(estimates) <= 12
+
+
+def test_plan_under_load_applies_cheap_degradations():
+    plan, _ = _plan(60, loaded=True)
+    assert plan.fits
+    assert not plan.use_entity_extraction
+    assert plan.query_type == "bm25"
+    assert plan.num_predict == 512
+
+
+def test_plan_that_cannot_fit_is_not_started():
+    for seconds in (3, 1.5, 0.5):
+        plan, estimates = _plan(seconds)
+        assert not plan.fits
+        assert plan.degradations[-1] == DEADLINE_EXCEEDED
+        assert (plan.limit, plan.num_predict) == (1, 64)
+        assert plan.expected_seconds(estimates) > seconds
+
+
+def test_latency_estimates_follow_measurements():
+    estimates = LatencyEstimates(ESTIMATES, smoothing=0.5)
+    estimates.observe("search_bm25", 0.3)
+    assert abs(estimates.search("bm25") - 0.2) < 1e-9
+    before = estimates.generation(2, 100)
+    estimates.observe_generation(2 * before, 2, 100)
+    assert abs(estimates.generation(2, 100) - 1.5 * before) < 1e-9
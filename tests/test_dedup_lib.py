@@ -0,0 +1,62 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # repository root, for `src.` imports
+
+from src.core.retriver.util.dedup_lib import PageDeduplicator, collapse_duplicates
+from src.core.spi.vector_db_spi import SearchResult
+
+BOILERPLATE = "Definitions. Confidential Information means any information disclosed by either party."
+
+
+def _page(document: str, page_number: int, content: str, effective_date: str = "2024-01-01") -> dict:
+    return {"document": document, "page_number": page_number, "content": content, "effective_date": effective_date}
+
+
+def test_identical_pages_are_stored_once():
+    dedup = PageDeduplicator(report_near_duplicates=False)
+    dedup.add([_page("ORACLE", 1, BOILERPLATE), _page("ORACLE", 2, "Oracle fees.")])
+    dedup.add([_page("AWS", 3, "  " + BOILERPLATE.replace(" ", "\n", 1))])
+
+    objects = dedup.get_objects()
+    assert len(objects) == 2
+    assert objects[0]["documents"] == ["ORACLE", "AWS"]
+    assert objects[0]["occurrences"] == ["ORACLE#1", "AWS#3"]
+    assert dedup.report.duplicates == 1
+    assert dedup.report.duplicates_by_document == {"AWS": 1}
+    assert dedup.report.near_duplicates is None
+    assert "near-duplicates" not in dedup.report.summary()
+
+
+def test_different_effective_date_is_not_merged():
+    dedup = PageDeduplicator(report_near_duplicates=False)
+    dedup.add([_page("ORACLE", 1, BOILERPLATE), _page("AWS", 1, BOILERPLATE, effective_date="2025-01-01")])
+
+    assert len(dedup.get_objects()) == 2
+    assert dedup.report.duplicates == 0
+
+
+def test_near_duplicates_are_counted_not_merged():
+    dedup = PageDeduplicator(report_near_duplicates=True)
+    text = " ".join(f"word{i}" for i in range(200))
+    dedup.add([_page("ORACLE", 1, text + " notice period 30 days"), _page("AWS", 1, text + " notice period 60 days")])
+
+    assert len(dedup.get_objects()) == 2
+    assert dedup.report.near_duplicates == 1
+    assert "1 near-duplicates kept" in dedup.report.summary()
+
+
+def test_collapse_duplicates_does_not_modify_input():
+    first = SearchResult(properties={"content": BOILERPLATE, "document": "ORACLE", "page_number": 1})
+    second = SearchResult(properties={"content": BOILERPLATE + " ", "document": "AWS", "page_number": 3})
+    other = SearchResult(properties={"content": "Oracle fees.", "document": "ORACLE", "page_number": 2})
+
+    collapsed = collapse_duplicates([first, second, other])
+
+    assert [r.properties["document"] for r in collapsed] == ["ORACLE", "ORACLE"]
+    assert collapsed[0].properties["occurrences"] == ["ORACLE#1", "AWS#3"]
+    assert collapsed[0] is not first
+    assert "occurrences" not in first.properties
+    assert collapsed[1] is other
+    # collapsing the same (cached) results again gives the same answer
+    assert collapse_duplicates([first, second, other])[0].properties["occurrences"] == ["ORACLE#1", "AWS#3"]
@@ -0,0 +1,45 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # repository root, for `src.` imports
+
+from src.core.retriver.util.extraction_lib import TextElement, _group_layout_elements, _with_page_breaks
+
+
+def _element(category: str, text: str, page_number=None):
+    return SimpleNamespace(category=category, text=text, metadata=SimpleNamespace(page_number=page_number))
+
+
+def test_page_break_after_every_page():
+    pages = {1: [TextElement("NarrativeText", "one", 1)], 3: [TextElement("Title", "three", 3)]}
+
+    elements = _with_page_breaks(pages, 3)
+
+    assert [(e.category, e.text) for e in elements] == [
+        ("NarrativeText", "one"),
+        ("PageBreak", ""),
+        ("PageBreak", ""),  # page 2 has no elements but still counts
+        ("Title", "three"),
+        ("PageBreak", ""),
+    ]
+    assert [e.page_number for e in elements if e.category == "PageBreak"] == [1, 2, 3]
+
+
+def test_group_layout_elements_by_page_without_footers():
+    pages = {1: [TextElement("NarrativeText", "fast page", 1)]}
+    elements = [
+        _element("NarrativeText", "body", 2),
+        _element("UncategorizedText", "Page 2 of 9", 2),
+        _element("Title", "Page 3", 3),  # titles are never footers
+        _element("NarrativeText", "no page number"),
+    ]
+
+    _group_layout_elements(elements, pages, default_page=4)
+
+    assert {n: [e.text for e in els] for n, els in pages.items()} == {
+        1: ["fast page"],
+        2: ["body"],
+        3: ["Page 3"],
+        4: ["no page number"],
+    }
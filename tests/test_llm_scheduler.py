@@ -0,0 +1,102 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # repository root, for `src.` imports
+
+from src.sp_adapters.llm_scheduler import LLMScheduler
+
+TIMEOUT = 5
+
+
+def _blocked_scheduler(**kwargs) -> tuple[LLMScheduler, threading.Event]:
+    """Single-worker scheduler whose worker is busy until the returned event is set."""
+    scheduler = LLMScheduler(1, **kwargs)
+    started, release = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait(TIMEOUT)
+
+    scheduler.submit("blocker", block)
+    assert started.wait(TIMEOUT)
+    return scheduler, release
+
+
+def _record(order: list, name: str):
+    def fn():
+        order.append(name)
+        return name
+    return fn
+
+
+def test_interactive_lane_served_before_batch():
+    scheduler, release = _blocked_scheduler()
+    order: list[str] = []
+    batch = scheduler.submit("b", _record(order, "b"), priority="batch")
+    interactive = scheduler.submit("i", _record(order, "i"))
+    assert scheduler.metrics()["queue_depth_by_lane"] == {"interactive": 1, "batch": 1}
+
+    release.set()
+    assert batch.result(TIMEOUT) == "b" and interactive.result(TIMEOUT) == "i"
+    assert order == ["i", "b"]
+
+
+def test_coalesced_interactive_caller_promotes_batch_call():
+    scheduler, release = _blocked_scheduler()
+    order: list[str] = []
+    other = scheduler.submit("other", _record(order, "other"), priority="batch")
+    shared = scheduler.submit("shared", _record(order, "shared"), priority="batch")
+    promoted = scheduler.submit("shared", _record(order, "duplicate"))
+    assert promoted is shared
+
+    release.set()
+    assert shared.result(TIMEOUT) == "shared" and other.result(TIMEOUT) == "other"
+    assert order == ["shared", "other"]
+    assert scheduler.metrics()["coalesced"] == 1
+
+
+def test_request_expires_in_queue():
+    scheduler, release = _blocked_scheduler()
+    calls: list[str] = []
+    future = scheduler.submit("late", _record(calls, "late"), deadline=time.monotonic() + 0.05)
+    time.sleep(0.1)
+
+    release.set()
+    with pytest.raises(TimeoutError):
+        future.result(TIMEOUT)
+    assert calls == []
+    assert scheduler.metrics()["expired"] == 1
+
+
+def test_no_retry_past_deadline():
+    scheduler = LLMScheduler(1, max_retries=3, backoff=10.0, retryable=lambda e: True)
+    calls: list[int] = []
+
+    def fail():
+        calls.append(1)
+        raise ConnectionError("server busy")
+
+    future = scheduler.submit("k", fail, deadline=time.monotonic() + 1.0)
+    with pytest.raises(TimeoutError) as excinfo:
+        future.result(TIMEOUT)
+    assert isinstance(excinfo.value.__cause__, ConnectionError)
+    assert len(calls) == 1
+    assert scheduler.metrics()["retries"] == 0
+
+
+def test_retries_within_deadline():
+    scheduler = LLMScheduler(1, max_retries=3, backoff=0.01, retryable=lambda e: isinstance(e, ConnectionError))
+    calls: list[int] = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionError("server busy")
+        return "ok"
+
+    assert scheduler.submit("k", flaky, deadline=time.monotonic() + TIMEOUT).result(TIMEOUT) == "ok"
+    assert scheduler.metrics()["retries"] == 2
@@ -0,0 +1,103 @@
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # repository root, for `src.` imports
+
+from src.core.retriver.util import snapshot_lib
+from src.core.spi.vector_db_spi import SearchResult, VectorDBError
+
+SCHEMA = {
+    "class": "Page",
+    "properties": [
+        {"name": "content", "dataType": ["text"]},
+        {"name": "page_number", "dataType": ["int"]},
+        {"name": "documents", "dataType": ["text[]"]},
+        {"name": "effective_date", "dataType": ["date"]},
+        {"name": "metadata", "dataType": ["object"]},
+    ],
+}
+
+
+class FakeAdapter:
+    """In-memory stand-in for the vector DB methods snapshots use."""
+
+    def __init__(self):
+        self.schemas: dict[str, dict] = {}
+        self.objects: dict[str, list[tuple[str, dict, list[float]]]] = {}
+
+    def get_schema(self, collection):
+        return self.schemas[collection]
+
+    def iterate_objects(self, collection, include_vector=False):
+        for uuid, props, vector in self.objects[collection]:
+            yield SearchResult(properties=props, id=uuid, vector=vector if include_vector else None)
+
+    def collection_exists(self, collection):
+        return collection in self.schemas
+
+    def drop_collection(self, collection):
+        del self.schemas[collection]
+        del self.objects[collection]
+
+    def create_schema(self, schema):
+        self.schemas[schema["class"]] = schema
+        self.objects[schema["class"]] = []
+
+    def insert_objects(self, collection, objects, batch_size=100, vectors=None, uuids=None):
+        self.objects[collection].extend(zip(uuids, objects, vectors))
+
+    def count_objects(self, collection):
+        return len(self.objects[collection])
+
+
+def _source_adapter() -> FakeAdapter:
+    adapter = FakeAdapter()
+    adapter.create_schema(dict(SCHEMA))
+    for i in range(5):
+        props = {
+            "content": f"page {i}",
+            "page_number": i,
+            "documents": ["ORACLE", "AWS"] if i == 0 else ["ORACLE"],
+            "effective_date": datetime(2024, 1, 1, tzinfo=timezone.utc),
+            "metadata": {"section": i},
+        }
+        if i == 4:
+            del props["metadata"]
+        adapter.objects["Page"].append((f"00000000-0000-0000-0000-00000000000{i}", props, [0.5 * i, 1.0, -1.0]))
+    return adapter
+
+
+def test_round_trip(tmp_path):
+    source = _source_adapter()
+    clause_index = tmp_path / "clause_index.json"
+    clause_index.write_text('{"ORACLE": {}}')
+    path = tmp_path / "Page.parquet"
+
+    exported = snapshot_lib.export_collection(source, "Page", path, row_group_size=2, clause_index_path=clause_index)
+    assert (exported.objects, exported.dimensions) == (5, 3)
+
+    target = FakeAdapter()
+    restored_index = tmp_path / "restored" / "clause_index.json"
+    restored = snapshot_lib.restore_collection(
+        target, path, collection="PageCopy", batch_size=2, clause_index_path=restored_index
+    )
+    assert restored.objects == 5
+    assert target.schemas["PageCopy"]["class"] == "PageCopy"
+    assert target.objects["PageCopy"] == source.objects["Page"]
+    assert restored_index.read_text() == '{"ORACLE": {}}'
+
+
+def test_restore_refuses_existing_collection(tmp_path):
+    source = _source_adapter()
+    path = tmp_path / "Page.parquet"
+    snapshot_lib.export_collection(source, "Page", path, clause_index_path=None)
+
+    with pytest.raises(VectorDBError):
+        snapshot_lib.restore_collection(source, path, clause_index_path=None)
+    snapshot_lib.restore_collection(source, path, replace=True, clause_index_path=None)
+    assert source.count_objects("Page") == 5